@@ -16,8 +16,10 @@
 # In[1]:
 
 
-from IPython.display import Image
-Image(filename='data/states.png')
+import sys
+sys.path.append('..')
+from common.lazy import plotting
+plotting('IPython.display').Image(filename='data/states.png')
 
 
 # Before beginning your analysis, it's important that we familiarize ourselves with the dataset. 
@@ -28,8 +30,16 @@ Image(filename='data/states.png')
 # Import the pandas library as pd
 import pandas as pd
 
+from common.trace import stage
+from common.cache import StageCache
+from common.memory import downcast
+
+# Outputs of the slow steps, reused while their inputs and code are unchanged
+cache = StageCache()
+
 # Read 'police.csv' into a DataFrame named ri
-ri = pd.read_csv('data/police.csv')
+with stage('read police.csv') as s:
+    ri = s.output(pd.read_csv('data/police.csv'))
 
 # Examine the head of the DataFrame
 print(ri.head())
@@ -107,6 +117,11 @@ ri['is_arrested'] = ri.is_arrested.astype(bool)
 # Check the data type of 'is_arrested' (again)
 print(ri.is_arrested.dtype)
 
+# Narrower dtypes (python -m common.memory police); stop_duration stays a string
+# so that mapping it to minutes gives numbers, not another categorical
+ri = downcast(ri, dtypes={'driver_gender': 'category', 'driver_race': 'category', 'violation_raw': 'category',
+                          'violation': 'category', 'stop_outcome': 'category', 'district': 'category'})
+
 
 # The date and time of each traffic stop are stored in separate columns, both of which are object columns.
 
@@ -122,11 +137,16 @@ print(ri.stop_date.dtype, ri.stop_time.dtype)
 # In[9]:
 
 
-# Concatenate 'stop_date' and 'stop_time' (separated by a space)
-combined = ri.stop_date.str.cat(ri.stop_time, sep = ' ')
+@cache.stage('parse stop_datetime')
+def parse_stop_datetime(stop_date, stop_time):
+    # Concatenate 'stop_date' and 'stop_time' (separated by a space)
+    combined = stop_date.str.cat(stop_time, sep = ' ')
 
-# Convert 'combined' to datetime format
-ri['stop_datetime'] = pd.to_datetime(combined)
+    # Convert 'combined' to datetime format
+    return pd.to_datetime(combined)
+
+with stage('parse stop_datetime', rows_in=len(ri)):
+    ri['stop_datetime'] = parse_stop_datetime(ri.stop_date, ri.stop_time)
 
 # Examine the data type of 'stop_datetime'
 print(ri.stop_datetime.dtype)
@@ -266,8 +286,15 @@ print(ri.search_type.value_counts())
 # In[18]:
 
 
-# Check if 'search_type' contains the string 'Protective Frisk'
-ri['frisk'] = ri.search_type.str.contains('Protective Frisk', na = False)
+from search_types import encode_search_types, has_reason, reason_rates
+
+# Parse 'search_type' once into a bitmask over the vocabulary of search reasons
+with stage('encode search types', rows_in=len(ri)):
+    search_flags, search_reasons = encode_search_types(ri.search_type)
+print(search_reasons)
+
+# Check if the search included 'Protective Frisk'
+ri['frisk'] = has_reason(search_flags, search_reasons, 'Protective Frisk')
 
 # Check the data type of 'frisk'
 print(ri.frisk.dtype)
@@ -290,6 +317,9 @@ print(searched.frisk.mean())
 # Calculate the frisk rate for each gender
 print(searched.groupby('driver_gender').frisk.mean())
 
+# Share of searches that included each reason, for each gender
+print(reason_rates(search_flags, search_reasons, ri.driver_gender, mask = ri.search_conducted))
+
 
 # Interesting! The frisk rate is higher for males than for females, though we can't conclude that this difference is caused by the driver's gender, as [correlation does not imply causation](https://towardsdatascience.com/correlation-causation-how-alcohol-affects-life-expectancy-a68f7db943f8).
 
@@ -302,33 +332,40 @@ print(searched.groupby('driver_gender').frisk.mean())
 # In[20]:
 
 
+from rollups import RollupStore
+
+# Merge the sums and counts of the stops newer than the stored hour/day/month/year rollups
+# (stops merged before are skipped, so re-running on the same file aggregates nothing)
+with stage('merge rollups', rows_in=len(ri)):
+    rollups = RollupStore('data/rollups')
+    rollups.append_new('police.csv', ri, ['is_arrested', 'drugs_related_stop', 'search_conducted'])
+
 # Calculate the overall arrest rate
 print(ri.is_arrested.mean())
 
-# Calculate the hourly arrest rate
-print(ri.groupby(ri.index.hour).is_arrested.mean())
-
-# Save the hourly arrest rate
-hourly_arrest_rate = ri.groupby(ri.index.hour).is_arrested.mean()
+# Read the hourly arrest rate from the rollups
+hourly_arrest_rate = rollups.rate('hour', 'is_arrested')
+print(hourly_arrest_rate)
 
 
 # In[21]:
 
 
 # Import matplotlib.pyplot as plt
-import matplotlib.pyplot as plt
+plt = plotting('matplotlib.pyplot')
 get_ipython().run_line_magic('matplotlib', 'inline')
 
-# Create a line plot of 'hourly_arrest_rate'
-hourly_arrest_rate.plot()
+with stage('plot hourly arrest rate'):
+    # Create a line plot of 'hourly_arrest_rate'
+    hourly_arrest_rate.plot()
 
-# Add the xlabel, ylabel, and title
-plt.xlabel('Hour')
-plt.ylabel('Arrest Rate')
-plt.title('Arrest Rate by Time of Day')
+    # Add the xlabel, ylabel, and title
+    plt.xlabel('Hour')
+    plt.ylabel('Arrest Rate')
+    plt.title('Arrest Rate by Time of Day')
 
-# Display the plot
-plt.show()
+    # Display the plot
+    plt.show()
 
 
 # The arrest rate has a significant spike overnight, and then dips in the early morning hours.
@@ -340,11 +377,9 @@ plt.show()
 # In[22]:
 
 
-# Calculate the annual rate of drug-related stops
-print(ri.drugs_related_stop.resample('A').mean())
-
-# Save the annual rate of drug-related stops
-annual_drug_rate = ri.drugs_related_stop.resample('A').mean()
+# Read the annual rate of drug-related stops from the rollups
+annual_drug_rate = rollups.rate('year', 'drugs_related_stop')
+print(annual_drug_rate)
 
 # Create a line plot of 'annual_drug_rate'
 annual_drug_rate.plot()
@@ -361,8 +396,8 @@ plt.show()
 # In[23]:
 
 
-# Calculate and save the annual search rate
-annual_search_rate = ri.search_conducted.resample('A').mean()
+# Read the annual search rate from the rollups
+annual_search_rate = rollups.rate('year', 'search_conducted')
 
 # Concatenate 'annual_drug_rate' and 'annual_search_rate'
 annual = pd.concat([annual_drug_rate, annual_search_rate], axis = 'columns')
@@ -462,7 +497,12 @@ plt.show()
 
 
 # Read 'weather.csv' into a DataFrame named 'weather'
-weather = pd.read_csv('data/weather.csv')
+with stage('read weather.csv') as s:
+    weather = s.output(pd.read_csv('data/weather.csv'))
+
+# Narrower dtypes (python -m common.memory weather); int16 leaves room for TMAX - TMIN
+weather = downcast(weather, dtypes=dict({'STATION': 'category', 'TMIN': 'int16', 'TMAX': 'int16'},
+                                        **{col: 'float32' for col in weather.columns if col.startswith('WT')}))
 
 weather.head()
 
@@ -520,14 +560,16 @@ plt.show()
 # In[32]:
 
 
-# Copy 'WT01' through 'WT22' to a new DataFrame
-WT = weather.loc[:, 'WT01' : 'WT22']
+from weather_flags import pack_conditions, popcount, rate_conditions, has_conditions
 
-# Calculate the sum of each row in 'WT'
-weather['bad_conditions'] = WT.sum(axis = 'columns')
+# Pack 'WT01' through 'WT22' into one uint32 bitmask per day and drop the columns
+with stage('pack weather conditions', rows_in=len(weather)):
+    conditions, wt_columns = pack_conditions(weather.loc[:, 'WT01' : 'WT22'])
+    weather = weather.drop(columns = wt_columns)
+    weather['conditions'] = conditions
 
-# Replace missing values in 'bad_conditions' with '0'
-weather['bad_conditions'] = weather.bad_conditions.fillna(0).astype('int')
+    # Count the bad conditions of each day (the number of set bits)
+    weather['bad_conditions'] = popcount(weather.conditions)
 
 # Create a histogram to visualize 'bad_conditions'
 weather.bad_conditions.plot(kind = 'hist')
@@ -552,11 +594,8 @@ plt.show()
 # Count the unique values in 'bad_conditions' and sort the index
 print(weather.bad_conditions.value_counts().sort_index())
 
-# Create a dictionary that maps integers to strings
-mapping = {0:'good', 1:'bad', 2:'bad', 3:'bad', 4:'bad', 5:'worse', 6:'worse', 7:'worse', 8:'worse', 9:'worse'}
-
-# Convert the 'bad_conditions' integers to strings using the 'mapping'
-weather['rating'] = weather.bad_conditions.map(mapping)
+# Look up the rating of each count (0 is good, 1 through 4 bad, 5 and more worse)
+weather['rating'] = rate_conditions(weather.bad_conditions)
 
 # Count the unique values in 'rating'
 print(weather.rating.value_counts())
@@ -567,15 +606,15 @@ print(weather.rating.value_counts())
 # In[34]:
 
 
-# Create a list of weather ratings in logical order
-cats = ['good', 'bad', 'worse']
-
-# Change the data type of 'rating' to category
-weather['rating'] = weather.rating.astype('category', ordered = True, categories = cats)
+# 'rating' is already an ordered category: 'good' < 'bad' < 'worse'
+print(weather.rating.dtype)
 
 # Examine the head of 'rating'
 print(weather.rating.head())
 
+# Days with both fog (WT01) and ice pellets (WT04), answered with one bitwise AND
+print(has_conditions(weather.conditions, wt_columns, 'WT01', 'WT04').sum())
+
 
 # We'll prepare the traffic stop and weather rating DataFrames so that they're ready to be merged.
 
@@ -607,7 +646,12 @@ print(weather_rating.head())
 print(ri.shape)
 
 # Merge 'ri' and 'weather_rating' using a left join
-ri_weather = pd.merge(left=ri, right=weather_rating, left_on='stop_date', right_on='DATE', how='left')
+@cache.stage('merge weather rating')
+def merge_weather_rating(ri, weather_rating):
+    return pd.merge(left=ri, right=weather_rating, left_on='stop_date', right_on='DATE', how='left')
+
+with stage('merge weather rating', rows_in=len(ri)) as s:
+    ri_weather = s.output(merge_weather_rating(ri, weather_rating))
 
 # Examine the shape of 'ri_weather'
 print(ri_weather.shape)
@@ -634,7 +678,8 @@ print(ri_weather.groupby('rating').is_arrested.mean())
 print('---------------------------------------')
 
 # Calculate the arrest rate for each 'violation' and 'rating'
-print(ri_weather.groupby(['violation', 'rating']).is_arrested.mean())
+with stage('arrest rate by violation and rating', rows_in=len(ri_weather)):
+    print(ri_weather.groupby(['violation', 'rating']).is_arrested.mean())
 
 
 # Wow! The arrest rate increases as the weather gets worse, and that trend persists across many of the violation types. This doesn't prove a causal link, but it's quite an interesting result!
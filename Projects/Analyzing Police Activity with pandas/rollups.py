@@ -0,0 +1,154 @@
+"""Persisted sum/count rollups of the boolean stop metrics.
+
+The hourly arrest rate and the annual drug/search rates are means of boolean
+columns, so they can be kept as ``sum`` and ``count`` per hour-of-day, day,
+month and year. Those partial aggregates add up, which means a new partition
+of stops only has to be aggregated on its own and added to the stored
+tables; the full history is never read again and reading a rate is a lookup
+in a table of at most a few thousand rows.
+
+The store remembers the latest stop it has merged (its high-water mark).
+``append_new`` aggregates only the stops after it and records them as a
+partition named by the source file and their date range, so re-running the
+notebook on the same file merges nothing. After changing the cleaning,
+delete the store directory to rebuild it. Every save writes one CSV per grain
+into a new version directory and then replaces ``rollups.json``, which
+names that directory and lists the merged partitions and the high-water
+mark, with ``os.replace``. The sums and the partitions they include are
+therefore committed together: an interrupted save leaves the previous
+version in place.
+
+``rate`` labels days, months and years with timestamps like ``resample``
+does (the last day of the month or year), so the rates plot as before.
+"""
+import json
+import os
+import shutil
+
+import pandas as pd
+
+GRAINS = {
+    'hour': lambda index: index.hour,
+    'day': lambda index: index.strftime('%Y-%m-%d'),
+    'month': lambda index: index.strftime('%Y-%m'),
+    'year': lambda index: index.year,
+}
+
+# stored keys -> the labels of index.hour and resample('D'/'M'/'A')
+LABELS = {
+    'hour': lambda keys: keys.astype('int32'),
+    'day': lambda keys: pd.DatetimeIndex(keys),
+    'month': lambda keys: pd.PeriodIndex(keys, freq='M').to_timestamp(how='end').normalize(),
+    'year': lambda keys: pd.PeriodIndex(keys.astype(str), freq='Y').to_timestamp(how='end').normalize(),
+}
+
+
+def partial_rollups(stops, metrics, grains=GRAINS):
+    """Sum and count of every metric per key of every grain.
+
+    ``stops`` must have a ``DatetimeIndex`` (``stop_datetime`` in the
+    notebook). Returns ``{grain: frame}`` with ``<metric>_sum`` and
+    ``<metric>_count`` columns.
+    """
+    values = stops[metrics].astype('float64')
+    partials = {}
+    for grain, key in grains.items():
+        grouped = values.groupby(key(stops.index))
+        sums = grouped.sum().add_suffix('_sum')
+        counts = grouped.count().add_suffix('_count')
+        partials[grain] = pd.concat([sums, counts], axis='columns').rename_axis(grain)
+    return partials
+
+
+class RollupStore:
+    """Directory of rollup tables that partitions are merged into."""
+
+    def __init__(self, path):
+        self.path = path
+        self.tables = {}
+        self.partitions = []
+        self.version = 0
+        # latest stop merged so far, and the name and resolution of the stops' index
+        self.high_water = None
+        self.index_name = None
+        self.index_unit = 'ns'
+        if os.path.exists(self._manifest_file()):
+            with open(self._manifest_file()) as f:
+                manifest = json.load(f)
+            self.version = manifest['version']
+            self.partitions = manifest['partitions']
+            self.high_water = pd.Timestamp(manifest['high_water'])
+            self.index_name = manifest['index_name']
+            self.index_unit = manifest['index_unit']
+            for grain in manifest['grains']:
+                self.tables[grain] = pd.read_csv(self._table_file(self.version, grain), index_col=0)
+
+    def _manifest_file(self):
+        return os.path.join(self.path, 'rollups.json')
+
+    def _version_dir(self, version):
+        return os.path.join(self.path, 'v{}'.format(version))
+
+    def _table_file(self, version, grain):
+        return os.path.join(self._version_dir(version), '{}.csv'.format(grain))
+
+    def merge(self, partials):
+        for grain, table in partials.items():
+            if grain in self.tables:
+                table = self.tables[grain].add(table, fill_value=0)
+            self.tables[grain] = table.sort_index()
+
+    def append(self, partition, stops, metrics):
+        """Merge the rollups of one new partition of stops and save the store.
+
+        Returns ``False`` (and changes nothing) if ``partition`` was already
+        merged.
+        """
+        if partition in self.partitions:
+            return False
+        self.merge(partial_rollups(stops, metrics))
+        self.partitions.append(partition)
+        latest = stops.index.max()
+        self.high_water = latest if self.high_water is None else max(self.high_water, latest)
+        self.index_name, self.index_unit = stops.index.name, stops.index.unit
+        self.save()
+        return True
+
+    def append_new(self, source, stops, metrics):
+        """Merge the stops of ``source`` after the high-water mark; returns how many were new.
+
+        Stops at or before the latest one already merged count as merged.
+        """
+        new = stops if self.high_water is None else stops[stops.index > self.high_water]
+        if not len(new):
+            return 0
+        partition = '{} {}..{}'.format(source, new.index.min(), new.index.max())
+        self.append(partition, new, metrics)
+        return len(new)
+
+    def save(self):
+        version = self.version + 1
+        # left over from a save that was interrupted before its manifest was written
+        shutil.rmtree(self._version_dir(version), ignore_errors=True)
+        os.makedirs(self._version_dir(version))
+        for grain, table in self.tables.items():
+            table.to_csv(self._table_file(version, grain))
+        tmp = self._manifest_file() + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump({'version': version, 'grains': list(self.tables), 'partitions': self.partitions,
+                       'high_water': self.high_water.isoformat(), 'index_name': self.index_name,
+                       'index_unit': self.index_unit}, f)
+        # the commit point: readers see either the old or the new tables with their partitions
+        os.replace(tmp, self._manifest_file())
+        shutil.rmtree(self._version_dir(self.version), ignore_errors=True)
+        self.version = version
+
+    def rate(self, grain, metric):
+        """Mean of ``metric`` per key of ``grain``, e.g. ``rate('hour', 'is_arrested')``."""
+        table = self.tables[grain]
+        rate = (table[metric + '_sum'] / table[metric + '_count']).rename(metric)
+        labels = LABELS[grain](table.index)
+        if isinstance(labels, pd.DatetimeIndex):
+            labels = labels.as_unit(self.index_unit)
+        rate.index = labels.rename(self.index_name)
+        return rate
@@ -0,0 +1,66 @@
+"""Multi-label ``search_type`` encoded as a vocabulary and a per-stop bitmask.
+
+``search_type`` is a comma-separated list of search reasons
+(``'Incident to Arrest,Protective Frisk'``). Checking one reason with
+``str.contains`` scans every string, and every further reason scans them
+again. Only a few hundred distinct combinations occur, so each distinct
+string is split once, turned into a bitmask over the vocabulary of reasons,
+and the stops get their mask by indexing with the factorized codes. After
+that every flag and rate is integer arithmetic.
+"""
+import numpy as np
+import pandas as pd
+
+
+def encode_search_types(search_type, sep=','):
+    """Return the ``uint64`` reason bitmask of every stop and the reason vocabulary.
+
+    Stops without a search type get an empty mask. Bit ``i`` stands for
+    ``vocab[i]``; reasons are sorted so the encoding is stable across runs.
+    """
+    codes, combos = pd.factorize(search_type)
+    labels = [[part.strip() for part in combo.split(sep)] for combo in combos]
+    vocab = sorted({label for combo in labels for label in combo})
+    if len(vocab) > 64:
+        raise ValueError('at most 64 search reasons fit in a uint64, got {}'.format(len(vocab)))
+    bit = {label: np.uint64(1) << np.uint64(i) for i, label in enumerate(vocab)}
+
+    # one mask per distinct combination, plus a trailing empty mask for NaN (code -1)
+    combo_masks = np.zeros(len(combos) + 1, dtype=np.uint64)
+    for i, combo in enumerate(labels):
+        for label in combo:
+            combo_masks[i] |= bit[label]
+    flags = combo_masks[codes]
+    return pd.Series(flags, index=search_type.index, name='search_flags'), vocab
+
+
+def reason_mask(vocab, *reasons):
+    mask = np.uint64(0)
+    for reason in reasons:
+        mask |= np.uint64(1) << np.uint64(vocab.index(reason))
+    return mask
+
+
+def has_reason(flags, vocab, *reasons):
+    """Boolean Series: did the stop's search include all of ``reasons``?"""
+    mask = reason_mask(vocab, *reasons)
+    return (flags & mask) == mask
+
+
+def indicators(flags, vocab):
+    """Dense 0/1 ``uint8`` indicator frame, one column per reason."""
+    shifts = np.arange(len(vocab), dtype=np.uint64)
+    bits = (np.asarray(flags, dtype=np.uint64)[:, None] >> shifts) & np.uint64(1)
+    return pd.DataFrame(bits.astype(np.uint8), columns=vocab, index=flags.index)
+
+
+def reason_rates(flags, vocab, by, mask=None):
+    """Rate of every search reason per group of ``by`` (e.g. ``ri.driver_gender``).
+
+    ``mask`` restricts the stops, e.g. to ``ri.search_conducted`` for the
+    share of searches that included each reason.
+    """
+    ind = indicators(flags, vocab)
+    if mask is not None:
+        ind, by = ind[mask.to_numpy()], by[mask.to_numpy()]
+    return ind.groupby(by.to_numpy()).mean()
@@ -0,0 +1,149 @@
+"""Run the stop analysis over one file per state in a process pool.
+
+The notebook works on the single Rhode Island file. The Stanford Open
+Policing data has one file per state, so here every worker cleans one state
+file the same way the notebook cleans ``police.csv`` and returns partial
+aggregates: the number of stops and the sums of the boolean metrics per
+violation, gender, hour, district and weather rating. Sums and counts add
+up, so the coordinator gets national tables by adding the state tables,
+which is exactly what a single process over the concatenated files computes.
+The per-state tables are kept too (``state`` as outer index level).
+``--check`` verifies that and reports the speedup over one process.
+
+    python state_stops.py data/states/*.csv --processes 8 --weather data/weather.csv --check
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from weather_flags import pack_conditions, popcount, rate_conditions
+
+METRICS = ['is_arrested', 'search_conducted', 'drugs_related_stop']
+
+# table name -> grouping keys ('hour' is the hour of the stop)
+DIMENSIONS = {
+    'violation': ['violation'],
+    'driver_gender': ['driver_gender'],
+    'violation_gender': ['violation', 'driver_gender'],
+    'hour': ['hour'],
+    'district_violation': ['district', 'violation'],
+    'rating': ['rating'],
+    'violation_rating': ['violation', 'rating'],
+}
+
+
+def load_stops(path):
+    """Read and clean one state's stop file like the notebook cleans ``police.csv``."""
+    ri = pd.read_csv(path)
+    ri = ri.drop(columns=[c for c in ('county_name', 'state') if c in ri.columns])
+    ri = ri.dropna(subset=['driver_gender'])
+    for metric in METRICS:
+        ri[metric] = ri[metric].astype(bool)
+    ri['stop_datetime'] = pd.to_datetime(ri.stop_date.str.cat(ri.stop_time, sep=' '))
+    return ri.set_index('stop_datetime')
+
+
+def load_ratings(path):
+    """``DATE`` -> weather rating, as in the notebook's weather section."""
+    weather = pd.read_csv(path)
+    conditions, _ = pack_conditions(weather.loc[:, 'WT01':'WT22'])
+    return pd.Series(rate_conditions(popcount(conditions)), index=weather['DATE'], name='rating')
+
+
+def partial_aggregates(ri, ratings=None):
+    """``{table: frame}`` of stop counts and metric sums for every dimension."""
+    if ratings is not None:
+        ri = ri.assign(rating=ri.stop_date.map(ratings))
+    values = ri[METRICS].astype('int64')
+    values.insert(0, 'stops', 1)
+    columns = dict(ri.items(), hour=pd.Series(ri.index.hour, index=ri.index, name='hour'))
+    partials = {}
+    for name, keys in DIMENSIONS.items():
+        if not all(k in columns for k in keys):
+            continue
+        partials[name] = values.groupby([columns[k] for k in keys], observed=True).sum()
+    return partials
+
+
+def state_partials(path, weather_path=None):
+    """Worker: the partial aggregates of one state file."""
+    ratings = load_ratings(weather_path) if weather_path else None
+    state = os.path.splitext(os.path.basename(path))[0]
+    return state, partial_aggregates(load_stops(path), ratings)
+
+
+def combine(tables):
+    """Add up partial aggregate tables that share the same index levels."""
+    table = pd.concat(tables)
+    return table.groupby(level=list(range(table.index.nlevels)), observed=True).sum().sort_index()
+
+
+def rates(table):
+    """Per-key rates (metric sum / stops) of an aggregate table."""
+    return table[METRICS].div(table['stops'], axis='index')
+
+
+def run_states(paths, processes=None, weather_path=None):
+    """National and per-state aggregate tables for a list of state files."""
+    if processes == 1:
+        results = [state_partials(p, weather_path) for p in paths]
+    else:
+        with ProcessPoolExecutor(processes) as pool:
+            results = list(pool.map(state_partials, paths, [weather_path] * len(paths)))
+
+    national, by_state = {}, {}
+    for name in DIMENSIONS:
+        parts = {state: partials[name] for state, partials in results if name in partials}
+        if parts:
+            national[name] = combine(list(parts.values()))
+            by_state[name] = pd.concat(parts, names=['state']).sort_index()
+    return national, by_state
+
+
+def single_process(paths, weather_path=None):
+    """Aggregates of all files concatenated and grouped at once, for checking."""
+    ratings = load_ratings(weather_path) if weather_path else None
+    ri = pd.concat([load_stops(p) for p in paths])
+    return {name: table.sort_index() for name, table in partial_aggregates(ri, ratings).items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Aggregate one police stop file per state in parallel.')
+    parser.add_argument('paths', nargs='+')
+    parser.add_argument('--processes', type=int, default=os.cpu_count())
+    parser.add_argument('--weather', help='weather.csv used to rate every stop date')
+    parser.add_argument('--check', action='store_true', help='compare with one process over all files')
+    parser.add_argument('--out', help='directory to write the national/per-state tables to')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    national, by_state = run_states(args.paths, args.processes, args.weather)
+    elapsed = time.perf_counter() - start
+    print('{} files, {} processes: {:.2f} s'.format(len(args.paths), args.processes, elapsed))
+
+    for name, table in national.items():
+        print('\n' + name)
+        print(rates(table))
+
+    if args.check:
+        expected = single_process(args.paths, args.weather)
+        same = all(national[name].equals(expected[name]) for name in expected)
+        print('\nidentical to a single-process run: {}'.format(same))
+        start = time.perf_counter()
+        run_states(args.paths, 1, args.weather)
+        serial = time.perf_counter() - start
+        print('1 process: {:.2f} s, speedup with {} processes: {:.1f}x'.format(
+            serial, args.processes, serial / elapsed))
+
+    if args.out:
+        os.makedirs(args.out, exist_ok=True)
+        for name in national:
+            national[name].to_csv(os.path.join(args.out, 'national_{}.csv'.format(name)))
+            by_state[name].to_csv(os.path.join(args.out, 'state_{}.csv'.format(name)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""Weather-type flags packed into one ``uint32`` bitmask per day.
+
+``weather.csv`` has one column per weather type (``WT01`` ... ``WT22``) holding
+1 or NaN. Summing those float columns row by row and mapping the counts
+through a dict works, but costs 22 float64 columns per day and every question
+about specific conditions needs another column scan. Here the columns are
+packed into a single ``uint32`` (bit ``i`` = ``columns[i]``), the number of bad
+conditions is the popcount of that mask and the rating is looked up from the
+count as codes of an ordered ``CategoricalDtype``.
+"""
+import numpy as np
+import pandas as pd
+
+RATING = pd.CategoricalDtype(['good', 'bad', 'worse'], ordered=True)
+
+# rating code for 0..32 bad conditions: 0 -> good, 1-4 -> bad, 5+ -> worse
+RATING_CODES = np.array([0] + [1] * 4 + [2] * 28, dtype=np.int8)
+
+_POPCOUNT8 = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def pack_conditions(wt):
+    """Pack the 1/NaN weather-type columns of ``wt`` into a ``uint32`` Series.
+
+    Returns the bitmask and the list of columns in bit order, which
+    ``condition_mask`` needs to turn names back into bits.
+    """
+    columns = list(wt.columns)
+    if len(columns) > 32:
+        raise ValueError('at most 32 weather types fit in a uint32, got {}'.format(len(columns)))
+    present = wt.notna().to_numpy() & (wt.fillna(0).to_numpy() != 0)
+    weights = np.left_shift(np.uint32(1), np.arange(len(columns), dtype=np.uint32))
+    flags = (present * weights).sum(axis=1, dtype=np.uint32)
+    return pd.Series(flags, index=wt.index, name='conditions'), columns
+
+
+def popcount(flags):
+    """Number of set bits of every ``uint32`` in ``flags``."""
+    flags = np.asarray(flags, dtype=np.uint32)
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(flags).astype(np.int64)
+    as_bytes = flags.view(np.uint8).reshape(-1, 4)
+    return _POPCOUNT8[as_bytes].sum(axis=1, dtype=np.int64)
+
+
+def rate_conditions(bad_conditions):
+    """Ordered ``good``/``bad``/``worse`` ratings for counts of bad conditions."""
+    codes = RATING_CODES[np.asarray(bad_conditions)]
+    return pd.Categorical.from_codes(codes, dtype=RATING)
+
+
+def condition_mask(columns, *names):
+    """The bits of the named weather types, e.g. ``condition_mask(cols, 'WT01', 'WT09')``."""
+    mask = 0
+    for name in names:
+        mask |= 1 << columns.index(name)
+    return np.uint32(mask)
+
+
+def has_conditions(flags, columns, *names):
+    """Boolean mask of the days on which all the named weather types occurred."""
+    mask = condition_mask(columns, *names)
+    return (np.asarray(flags, dtype=np.uint32) & mask) == mask
@@ -10,7 +10,13 @@ from sklearn.ensemble import AdaBoostClassifier
 from sklearn.metrics import roc_auc_score
 from sklearn.model_selection import train_test_split
 
-ds=pd.read_csv("indian_liver_patient_preprocessed.csv")
+import sys
+import time
+sys.path.append('..')
+from common.trace import stage
+
+with stage('read liver csv') as s:
+    ds=s.output(pd.read_csv("indian_liver_patient_preprocessed.csv"))
 
 X=ds.iloc[:,:10]
 y=ds.iloc[:,-1]
@@ -19,7 +25,8 @@ X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.3, random_
 dt = DecisionTreeClassifier(max_depth=2, random_state=1)
 ada = AdaBoostClassifier(base_estimator=dt, n_estimators=180, random_state=1)
 
-ada.fit(X_train, y_train)
+with stage('fit ada', rows_in=len(X_train)):
+    ada.fit(X_train, y_train)
 y_pred_proba = ada.predict_proba(X_test)[:,1]
 
 ada_roc_auc = roc_auc_score(y_test, y_pred_proba)
@@ -31,7 +38,10 @@ from sklearn.ensemble import GradientBoostingRegressor
 from sklearn.metrics import mean_squared_error as MSE
 
 gb = GradientBoostingRegressor(max_depth=4,n_estimators=200,random_state=2)
-gb.fit(X_train, y_train)
+start = time.perf_counter()
+with stage('fit gb', rows_in=len(X_train)):
+    gb.fit(X_train, y_train)
+gb_fit_time = time.perf_counter() - start
 y_pred = gb.predict(X_test)
 
 mse_test = MSE(y_test, y_pred)
@@ -46,12 +56,53 @@ from sklearn.metrics import mean_squared_error as MSE
 sgbr = GradientBoostingRegressor(max_depth=4, subsample=0.9, max_features=0.75, 
                                  n_estimators=200, random_state=2)
 
-sgbr.fit(X_train, y_train)
+start = time.perf_counter()
+with stage('fit sgbr', rows_in=len(X_train)):
+    sgbr.fit(X_train, y_train)
+sgbr_fit_time = time.perf_counter() - start
 y_pred = sgbr.predict(X_test)
 mse_test = MSE(y_test, y_pred)
 rmse_test = mse_test**(1/2)
 
 print('Test set RMSE of sgbr: {:.3f}'.format(rmse_test))
 
+####################################################################################################
 
-
+from sklearn.ensemble import GradientBoostingClassifier
+from common.histboost import load_binned, HistGradientBoosting
+
+# Features quantized into uint8 bins once (cached in liver_bins.npz), every boosting variant fits on the codes
+with stage('bin features', rows_in=len(X)):
+    codes, edges = load_binned('liver_bins.npz', X.values)
+codes_train, codes_test = codes[X.index.get_indexer(X_train.index)], codes[X.index.get_indexer(X_test.index)]
+
+# gb and sgbr were fitted above, only their binned counterparts are fitted here
+fit_times = {'gb': gb_fit_time, 'sgbr': sgbr_fit_time}
+regressors = [
+    ('gb', gb, X_test),
+    ('binned gb', HistGradientBoosting(max_depth=4, n_estimators=200, random_state=2), codes_test),
+    ('sgbr', sgbr, X_test),
+    ('binned sgbr', HistGradientBoosting(max_depth=4, subsample=0.9, max_features=0.75,
+                                         n_estimators=200, random_state=2), codes_test),
+]
+for name, model, test in regressors:
+    if name not in fit_times:
+        start = time.perf_counter()
+        with stage('fit ' + name, rows_in=len(codes_train)):
+            model.fit(codes_train, y_train)
+        fit_times[name] = time.perf_counter() - start
+    rmse_test = MSE(y_test, model.predict(test))**(1/2)
+    print('Test set RMSE of {}: {:.3f} (fit {:.3f} s)'.format(name, rmse_test, fit_times[name]))
+
+classifiers = [
+    ('gbc', GradientBoostingClassifier(max_depth=4, n_estimators=200, random_state=2), X_train, X_test),
+    ('binned gbc', HistGradientBoosting(loss='log_loss', max_depth=4, n_estimators=200, random_state=2),
+     codes_train, codes_test),
+]
+for name, model, train, test in classifiers:
+    start = time.perf_counter()
+    with stage('fit ' + name, rows_in=len(train)):
+        model.fit(train, y_train)
+    fit_time = time.perf_counter() - start
+    roc_auc = roc_auc_score(y_test, model.predict_proba(test)[:, 1])
+    print('ROC AUC score of {}: {:.2f} (fit {:.3f} s)'.format(name, roc_auc, fit_time))
@@ -0,0 +1,179 @@
+"""Train the credit card approval model on a stream of application chunks.
+
+The notebook reads every application into memory, turns the frame into one
+array and fits ``LogisticRegression`` on it. Here the applications are read
+``chunksize`` rows at a time and nothing but the model and a few running
+statistics stays in memory:
+
+* ``ApplicationEncoder`` keeps per numeric column the running min, max, sum
+  and count (min-max scaling and mean imputation) and per categorical column
+  the codes and counts of the values seen so far (label codes in order of
+  first appearance, most frequent value for imputation); it is updated with
+  every training chunk before that chunk is transformed,
+* ``SGDClassifier(loss='log_loss')`` is trained with ``partial_fit`` on the
+  encoded chunks, re-reading the file for every epoch. Its ``alpha`` is kept
+  at ``1 / (C * n_train)`` from the running row count, which makes its
+  objective ``LogisticRegression(C=C)``'s.
+
+Rows are held out for testing by their row number, so the split does not
+depend on the chunk size. ``--check`` holds out exactly the notebook's test
+rows and compares accuracy and confusion matrix with the batch ``logreg``.
+
+    python stream_sgd.py datasets/cc_approvals.data --chunksize 100 --epochs 50 --check
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.metrics import confusion_matrix
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import LabelEncoder, MinMaxScaler
+
+NUMERIC = [1, 2, 7, 10, 14]
+CATEGORICAL = [0, 3, 4, 5, 6, 8, 9, 12]
+# the notebook drops 11 and 13 and keeps the remaining columns in order
+FEATURES = [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 12, 14]
+LABEL = 15
+CLASSES = np.array(['+', '-'])
+
+
+def read_chunks(path, chunksize):
+    """Chunks of applications; ``'?'`` is missing and categorical columns stay strings."""
+    return pd.read_csv(path, header=None, na_values='?', chunksize=chunksize,
+                       dtype={c: str for c in CATEGORICAL + [LABEL]})
+
+
+def is_test(rows, test_size=0.33, seed=42):
+    """Deterministic hash split of row numbers into train (False) and test (True)."""
+    h = (np.asarray(rows, dtype=np.uint64) + np.uint64(seed)) * np.uint64(2654435761) % np.uint64(2 ** 32)
+    return h < np.uint64(test_size * 2 ** 32)
+
+
+class ApplicationEncoder:
+    """Running scaling statistics and category codes of the application columns."""
+
+    def __init__(self):
+        self.low = pd.Series(np.inf, index=NUMERIC)
+        self.high = pd.Series(-np.inf, index=NUMERIC)
+        self.total = pd.Series(0.0, index=NUMERIC)
+        self.count = pd.Series(0, index=NUMERIC)
+        self.codes = {c: {} for c in CATEGORICAL}
+        self.counts = {c: [] for c in CATEGORICAL}
+
+    def update(self, chunk):
+        numeric = chunk[NUMERIC].astype('float64')
+        self.low = np.fmin(self.low, numeric.min())
+        self.high = np.fmax(self.high, numeric.max())
+        self.total += numeric.sum()
+        self.count += numeric.count()
+        for c in CATEGORICAL:
+            codes, counts = self.codes[c], self.counts[c]
+            for value, n in chunk[c].value_counts().items():
+                if value not in codes:
+                    codes[value] = len(codes)
+                    counts.append(0)
+                counts[codes[value]] += n
+
+    def transform(self, chunk):
+        """Encoded, imputed and min-max scaled feature matrix in ``FEATURES`` order."""
+        encoded = pd.DataFrame(index=chunk.index)
+        means = self.total / self.count
+        for c in NUMERIC:
+            encoded[c] = chunk[c].astype('float64').fillna(means[c])
+        for c in CATEGORICAL:
+            most_frequent = int(np.argmax(self.counts[c]))
+            # values not seen in training get the code of the most frequent one
+            encoded[c] = chunk[c].map(self.codes[c]).fillna(most_frequent).astype('float64')
+        encoded = encoded[FEATURES]
+        low = pd.concat([self.low, pd.Series({c: 0.0 for c in CATEGORICAL})])[FEATURES]
+        high = pd.concat([self.high, pd.Series({c: max(len(self.codes[c]) - 1, 0.0) for c in CATEGORICAL})])[FEATURES]
+        span = (high - low).replace(0, 1)
+        return ((encoded - low) / span).to_numpy()
+
+
+def train_sgd(path, chunksize=100, epochs=50, test_rows=None, C=1.0, random_state=42, **sgd_params):
+    """Encoder and ``SGDClassifier`` trained on the training rows of the stream.
+
+    ``test_rows`` are the held-out row numbers; by default ``is_test`` decides.
+    """
+    encoder = ApplicationEncoder()
+    model = SGDClassifier(loss='log_loss', random_state=random_state, **sgd_params)
+    n_train = 0
+    for epoch in range(epochs):
+        start = 0
+        for chunk in read_chunks(path, chunksize):
+            rows = np.arange(start, start + len(chunk))
+            start += len(chunk)
+            test = is_test(rows) if test_rows is None else np.isin(rows, test_rows)
+            train = chunk[~test]
+            if train.empty:
+                continue
+            if epoch == 0:
+                encoder.update(train)
+                n_train += len(train)
+                model.set_params(alpha=1 / (C * n_train))
+            model.partial_fit(encoder.transform(train), train[LABEL].to_numpy(), classes=CLASSES)
+    return encoder, model
+
+
+def evaluate(path, encoder, model, chunksize=100, test_rows=None):
+    """Accuracy and confusion matrix (labels ``+``, ``-``) on the held-out rows."""
+    matrix = np.zeros((len(CLASSES), len(CLASSES)), dtype=np.int64)
+    start = 0
+    for chunk in read_chunks(path, chunksize):
+        rows = np.arange(start, start + len(chunk))
+        start += len(chunk)
+        test = is_test(rows) if test_rows is None else np.isin(rows, test_rows)
+        if test.any():
+            held_out = chunk[test]
+            matrix += confusion_matrix(held_out[LABEL], model.predict(encoder.transform(held_out)), labels=CLASSES)
+    return np.trace(matrix) / matrix.sum(), matrix
+
+
+def batch_logreg(path, test_size=0.33, random_state=42):
+    """The notebook's in-memory model; returns accuracy, confusion matrix and the test rows.
+
+    Mean/mode imputation, label encoding, dropping 11 and 13, the 0.33 split
+    with ``random_state=42``, min-max scaling fitted on the training rows and
+    ``LogisticRegression()``.
+    """
+    cc_apps = pd.read_csv(path, header=None, na_values='?')
+    for col in cc_apps:
+        if col in NUMERIC:
+            cc_apps[col] = cc_apps[col].fillna(cc_apps[col].mean())
+        else:
+            cc_apps[col] = LabelEncoder().fit_transform(cc_apps[col].fillna(cc_apps[col].value_counts().index[0]))
+    X, y = cc_apps[FEATURES].to_numpy(), cc_apps[LABEL].to_numpy()
+    rows = np.arange(len(cc_apps))
+    X_train, X_test, y_train, y_test, _, test_rows = train_test_split(
+        X, y, rows, test_size=test_size, random_state=random_state)
+    scaler = MinMaxScaler(feature_range=(0, 1)).fit(X_train)
+    logreg = LogisticRegression().fit(scaler.transform(X_train), y_train)
+    y_pred = logreg.predict(scaler.transform(X_test))
+    return (y_pred == y_test).mean(), confusion_matrix(y_test, y_pred), np.sort(test_rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Train the approval model with SGD on chunks of applications.')
+    parser.add_argument('path')
+    parser.add_argument('--chunksize', type=int, default=100)
+    parser.add_argument('--epochs', type=int, default=50)
+    parser.add_argument('--check', action='store_true', help="hold out the notebook's test rows and compare with logreg")
+    args = parser.parse_args()
+
+    test_rows = None
+    if args.check:
+        batch_accuracy, batch_matrix, test_rows = batch_logreg(args.path)
+    encoder, model = train_sgd(args.path, args.chunksize, args.epochs, test_rows)
+    accuracy, matrix = evaluate(args.path, encoder, model, args.chunksize, test_rows)
+    print('Accuracy of streamed SGD classifier: {:.3f}'.format(accuracy))
+    print(matrix)
+    if args.check:
+        print('Accuracy of batch logistic regression: {:.3f}'.format(batch_accuracy))
+        print(batch_matrix)
+        print('predictions differing per cell: {}'.format((matrix - batch_matrix).tolist()))
+
+
+if __name__ == '__main__':
+    main()
@@ -74,7 +74,10 @@ get_ipython().run_cell_magic('nose', '', '# %%nose needs to be included at the b
 
 
 # Import matplotlib and set plotting style
-from matplotlib import pyplot as plt
+import sys
+sys.path.append('..')
+from common.lazy import plotting
+plt = plotting('matplotlib.pyplot')
 get_ipython().run_line_magic('matplotlib', 'inline')
 plt.style.use('seaborn')
 
@@ -132,7 +135,7 @@ get_ipython().run_cell_magic('nose', '', '# %%nose needs to be included at the b
 games_tv = pd.merge(tv[tv['super_bowl'] > 1], super_bowls, on='super_bowl')
 
 # Import seaborn
-import seaborn as sns
+sns = plotting('seaborn')
 
 # Create a scatter plot with a linear regression model fit
 sns.regplot(x=games_tv.difference_pts, y=games_tv.share_household, data=games_tv)
@@ -233,9 +236,10 @@ get_ipython().run_cell_magic('nose', '', '# %%nose needs to be included at the b
 # In[79]:
 
 
-# Filter out most marching bands
-no_bands = halftime_musicians[~halftime_musicians.musician.str.contains('Marching')]
-no_bands = no_bands[~no_bands.musician.str.contains('Spirit')]
+# Filter out most marching bands (both words in one pass over the distinct names)
+from common.textfilter import PatternFilter
+bands = PatternFilter(['Marching', 'Spirit'])
+no_bands = halftime_musicians[~bands.matches(halftime_musicians.musician)]
 
 # Plot a histogram of number of songs per performance
 most_songs = int(max(no_bands['num_songs'].values))
@@ -279,3 +283,14 @@ print('The winner of Super Bowl LIII will be the', super_bowl_LIII_winner)
 
 get_ipython().run_cell_magic('nose', '', '# %%nose needs to be included at the beginning of every @tests cell\n\n# One or more tests of the student\'s code\n# The @solution should pass the tests\n# The purpose of the tests is to try to catch common errors and\n# to give the student a hint on how to resolve these errors\n\ndef test_valid_winner_chosen():\n    assert super_bowl_LIII_winner == \'New England Patriots\' or super_bowl_LIII_winner == \'Los Angeles Rams\', \\\n    "It appears a valid potential winner was not selected. Please assign the patriots variable or the rams variable to super_bowl_LIII_winner."')
 
+
+# In[ ]:
+
+
+# The game join and the appearance counts from an integer-keyed star schema:
+# the join takes from arrays aligned with the games, the counts are a bincount
+from star_schema import SuperBowlStar
+star = SuperBowlStar(super_bowls, tv, halftime_musicians)
+
+star.games_tv(after=1).equals(games_tv), star.appearances().equals(halftime_appearances)
+
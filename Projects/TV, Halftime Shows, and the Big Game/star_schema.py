@@ -0,0 +1,85 @@
+"""The Super Bowl tables as a star schema with integer keys.
+
+The notebook joins the broadcasts to the games with
+``pd.merge(tv[tv['super_bowl'] > 1], super_bowls, on='super_bowl')`` and
+counts halftime appearances by grouping on the ``musician`` strings. Both
+hash strings or keys on every call. ``SuperBowlStar`` keys everything by
+position instead:
+
+* the games are the dimension, sorted by ``super_bowl``; a game's position
+  is its dense surrogate key and every game column is an array aligned with
+  it, so joining a fact row to its game is ``column.take(key)``,
+* ``key_of`` maps a ``super_bowl`` number to its surrogate key (-1 for
+  numbers without a game), so keying a fact table is one array lookup,
+* musicians are interned to integer ids in sorted name order, and
+  appearance counts are one ``bincount`` over the performance facts.
+
+Columns keep their pandas arrays (``str``, nullable, ...), so the frames
+built from them compare equal to the notebook's tables.
+
+    star = SuperBowlStar(super_bowls, tv, halftime_musicians)
+    star.games_tv(after=1)    # == pd.merge(tv[tv['super_bowl'] > 1], super_bowls, on='super_bowl')
+    star.appearances()        # == the notebook's halftime_appearances
+"""
+import numpy as np
+import pandas as pd
+
+
+class SuperBowlStar:
+    """Games as the dimension, TV broadcasts and halftime performances as facts."""
+
+    def __init__(self, super_bowls, tv, halftime_musicians, key='super_bowl'):
+        self.key = key
+        numbers = super_bowls[key].to_numpy()
+        if len(np.unique(numbers)) != len(numbers):
+            raise ValueError('{} must be unique in the games table'.format(key))
+        order = np.argsort(numbers, kind='stable')
+        self.numbers = numbers[order]
+        self.games = {c: super_bowls[c].array.take(order) for c in super_bowls.columns if c != key}
+        self.key_of = np.full(self.numbers.max() + 1, -1, dtype=np.intp)
+        self.key_of[self.numbers] = np.arange(len(self.numbers))
+
+        self.tv_columns = list(tv.columns)
+        self.tv = {c: tv[c].array for c in tv.columns}
+        self.tv_key = self.keys(tv[key])
+
+        self.musician_ids, self.musicians = pd.factorize(halftime_musicians['musician'], sort=True)
+        self.halftime_key = self.keys(halftime_musicians[key])
+        self.num_songs = halftime_musicians['num_songs'].to_numpy()
+
+    def keys(self, numbers):
+        """Surrogate keys of ``super_bowl`` numbers, -1 where there is no such game (or a missing number)."""
+        # a missing number makes the column float (or nullable), so compare as floats and cast the known ones
+        numbers = pd.Series(numbers).to_numpy(dtype=np.float64, na_value=np.nan)
+        keys = np.full(len(numbers), -1, dtype=np.intp)
+        known = (numbers >= 0) & (numbers < len(self.key_of)) & (numbers == np.floor(numbers))
+        keys[known] = self.key_of[numbers[known].astype(np.intp)]
+        return keys
+
+    def games_tv(self, after=0, suffixes=('_x', '_y')):
+        """Broadcasts of games after ``after`` joined with their game, in broadcast order.
+
+        Columns in both tables get ``suffixes`` like in ``pd.merge``.
+        """
+        rows = np.flatnonzero((self.tv_key >= 0) & (self.numbers.take(np.maximum(self.tv_key, 0)) > after))
+        keys = self.tv_key[rows]
+        both = set(self.tv_columns).intersection(self.games)
+        columns = {c + suffixes[0] if c in both else c: self.tv[c].take(rows) for c in self.tv_columns}
+        columns.update((c + suffixes[1] if c in both else c, values.take(keys)) for c, values in self.games.items())
+        # the taken arrays are new, so the frame can own them
+        return pd.DataFrame(columns, copy=False)
+
+    def appearance_counts(self):
+        """Number of halftime performances of every musician id."""
+        return np.bincount(self.musician_ids[self.musician_ids >= 0], minlength=len(self.musicians))
+
+    def appearances(self):
+        """Musicians with their number of performances (as ``super_bowl``), most first."""
+        table = pd.DataFrame({'musician': self.musicians, self.key: self.appearance_counts()})
+        return table.sort_values(self.key, ascending=False)
+
+    def songs_per_game(self):
+        """Total songs performed at each game's halftime show, by ``super_bowl`` number."""
+        known = (self.halftime_key >= 0) & ~np.isnan(self.num_songs)
+        songs = np.bincount(self.halftime_key[known], weights=self.num_songs[known], minlength=len(self.numbers))
+        return pd.Series(songs, index=pd.Index(self.numbers, name=self.key), name='num_songs')
@@ -0,0 +1,97 @@
+"""Streaming join of user reviews onto apps.
+
+The notebook merges the whole ``user_reviews.csv`` onto ``apps`` by app name
+and only then drops the reviews without a sentiment. Reviews outnumber apps
+by orders of magnitude, so here the reviews are read in chunks, the rows
+without ``Sentiment``/``Translated_Review`` are dropped before anything else
+is done with them, ``App`` is parsed straight into the categorical dtype built
+from ``apps`` (unknown apps become NaN, i.e. drop out of the inner join), and
+the join is a lookup on those integer codes.
+
+Only weighted value counts of ``Sentiment_Polarity`` per ``Type`` are kept
+between chunks, so the box statistics are exact (identical to
+``merged_df.groupby('Type').Sentiment_Polarity`` quantiles) while memory
+grows with the number of distinct polarity values, not with the reviews.
+"""
+import numpy as np
+import pandas as pd
+
+REVIEW_COLUMNS = ['App', 'Translated_Review', 'Sentiment', 'Sentiment_Polarity']
+
+
+def app_codes(apps):
+    """Categorical dtype of the app names plus an (app code x Type) row-count matrix.
+
+    ``apps`` can list the same name more than once; the inner merge then
+    repeats each review once per matching app row, which the counts in the
+    matrix reproduce as weights.
+    """
+    app_dtype = pd.CategoricalDtype(apps['App'].dropna().unique())
+    codes = apps['App'].astype(app_dtype).cat.codes.to_numpy()
+    type_codes, types = pd.factorize(apps['Type'])
+    keep = (codes >= 0) & (type_codes >= 0)
+    weights = np.zeros((len(app_dtype.categories), len(types)), dtype=np.int64)
+    np.add.at(weights, (codes[keep], type_codes[keep]), 1)
+    return app_dtype, types, weights
+
+
+def read_reviews(path, app_dtype, chunksize=100000):
+    """Yield review chunks with nulls dropped and ``App`` as shared categorical codes."""
+    reader = pd.read_csv(path, usecols=REVIEW_COLUMNS, dtype={'App': app_dtype},
+                         chunksize=chunksize)
+    for chunk in reader:
+        chunk = chunk.dropna(subset=['Sentiment', 'Translated_Review', 'App'])
+        yield chunk['App'].cat.codes.to_numpy(), chunk['Sentiment_Polarity'].to_numpy()
+
+
+def _weighted_percentile(values, weights, q):
+    # Same result as np.percentile(np.repeat(values, weights), q) for sorted values
+    cum = np.cumsum(weights)
+    pos = q / 100.0 * (cum[-1] - 1)
+    lo = values[np.searchsorted(cum, np.floor(pos), side='right')]
+    hi = values[np.searchsorted(cum, np.ceil(pos), side='right')]
+    return lo + (hi - lo) * (pos - np.floor(pos))
+
+
+def box_stats_from_counts(counts, whis=1.5):
+    """Box statistics of a distribution given as a value -> weight Series."""
+    counts = counts[counts > 0].sort_index()
+    values, weights = counts.index.to_numpy(dtype=float), counts.to_numpy()
+    q1, median, q3 = (_weighted_percentile(values, weights, q) for q in (25, 50, 75))
+    iqr = q3 - q1
+    inside = values[(values >= q1 - whis * iqr) & (values <= q3 + whis * iqr)]
+    return {
+        'count': int(weights.sum()),
+        'mean': float((values * weights).sum() / weights.sum()),
+        'min': values[0], 'q1': q1, 'median': median, 'q3': q3, 'max': values[-1],
+        'lowerfence': inside[0], 'upperfence': inside[-1],
+        'fliers': values[(values < inside[0]) | (values > inside[-1])],
+    }
+
+
+def sentiment_box_stats(apps, path, chunksize=100000):
+    """Per-``Type`` box statistics of ``Sentiment_Polarity`` over the inner join.
+
+    Equivalent to merging ``apps`` with the reviews on ``App``, dropping rows
+    without ``Sentiment``/``Translated_Review`` and describing
+    ``Sentiment_Polarity`` by ``Type``, without building the merged frame.
+    """
+    app_dtype, types, weights = app_codes(apps)
+    counts = [pd.Series(dtype=np.int64) for _ in types]
+    for codes, polarity in read_reviews(path, app_dtype, chunksize):
+        valid = ~np.isnan(polarity)
+        codes, polarity = codes[valid], polarity[valid]
+        for t in range(len(types)):
+            w = weights[codes, t]
+            chunk_counts = pd.Series(w[w > 0]).groupby(polarity[w > 0]).sum()
+            counts[t] = counts[t].add(chunk_counts, fill_value=0).astype(np.int64)
+    stats = {name: box_stats_from_counts(c) for name, c in zip(types, counts) if c.sum() > 0}
+    return pd.DataFrame.from_dict(stats, orient='index').sort_index()
+
+
+def plot_box_stats(stats, ax):
+    """Draw ``sentiment_box_stats`` output with matplotlib's ``bxp``."""
+    ax.bxp([{'label': name, 'med': row['median'], 'q1': row['q1'], 'q3': row['q3'],
+             'whislo': row['lowerfence'], 'whishi': row['upperfence'], 'fliers': row['fliers']}
+            for name, row in stats.iterrows()])
+    return ax
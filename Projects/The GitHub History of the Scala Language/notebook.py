@@ -18,10 +18,25 @@
 # Importing pandas
 import pandas as pd
 
-# Loading in the data
-pulls_one = pd.read_csv('datasets/pulls_2011-2013.csv')
-pulls_two = pd.read_csv('datasets/pulls_2014-2018.csv')
-pull_files = pd.read_csv('datasets/pull_files.csv')
+import sys
+sys.path.append('..')
+from common.trace import stage
+from common.cache import StageCache
+from common.memory import downcast
+from common.loader import read_all
+
+# Outputs of the slow steps, reused while their inputs and code are unchanged
+cache = StageCache()
+
+with stage('read pulls and pull_files') as s:
+    # Loading in the data (the three files are read at the same time)
+    frames = read_all({
+        'pulls_one': ('datasets/pulls_2011-2013.csv', {}),
+        'pulls_two': ('datasets/pulls_2014-2018.csv', {}),
+        'pull_files': ('datasets/pull_files.csv', {}),
+    })
+    pulls_one, pulls_two, pull_files = frames['pulls_one'], frames['pulls_two'], frames['pull_files']
+    s.output(pull_files)
 
 
 # In[125]:
@@ -38,11 +53,15 @@ get_ipython().run_cell_magic('nose', '', '\nimport pandas as pd\n\ndef test_pull
 # In[126]:
 
 
-# Append pulls_one to pulls_two
-pulls = pulls_one.append(pulls_two)
+with stage('append and parse dates', rows_in=len(pulls_one) + len(pulls_two)) as s:
+    # Append pulls_one to pulls_two
+    pulls = s.output(pulls_one.append(pulls_two))
 
-# Convert the date for the pulls object
-pulls['date'] = pd.to_datetime(pulls['date'],utc=True)
+    # Convert the date for the pulls object
+    pulls['date'] = pd.to_datetime(pulls['date'],utc=True)
+
+# Narrower dtypes (python -m common.memory pulls_2011-2013 pulls_2014-2018)
+pulls = downcast(pulls, dtypes={'pid': 'int32', 'user': 'category'})
 
 
 # In[127]:
@@ -58,7 +77,12 @@ get_ipython().run_cell_magic('nose', '', "\n# one or more tests of the students
 
 
 # Merge the two DataFrames
-data = pd.merge(pulls,pull_files,on='pid')
+@cache.stage('merge pulls and pull_files')
+def merge_pulls(pulls, pull_files):
+    return pd.merge(pulls, pull_files, on='pid')
+
+with stage('merge pulls and pull_files', rows_in=len(pulls)) as s:
+    data = s.output(merge_pulls(pulls, pull_files))
 
 
 # In[129]:
@@ -78,13 +102,20 @@ get_ipython().run_cell_magic('nose', '', '\n# one or more tests of the students
 get_ipython().run_line_magic('matplotlib', 'inline')
 
 # Create a column that will store the month and the year, as a string
-data['month_year'] = pd.DatetimeIndex(data['date']).year.astype(str)+            pd.DatetimeIndex(data['date']).month.astype(str)
+@cache.stage('month_year')
+def month_year(dates):
+    dates = pd.DatetimeIndex(dates)
+    return dates.year.astype(str) + dates.month.astype(str)
 
-# Group by month_year and count the pull requests
-counts = data.groupby("month_year").count()
+with stage('month_year counts', rows_in=len(data)) as s:
+    data['month_year'] = month_year(data['date'])
+
+    # Group by month_year and count the pull requests
+    counts = s.output(data.groupby("month_year").count())
 
 # Plot the results
-counts.plot(kind="bar")
+with stage('plot month_year counts'):
+    counts.plot(kind="bar")
 
 
 # In[131]:
@@ -103,10 +134,12 @@ get_ipython().run_cell_magic('nose', '', '    \ndef test_month_year_column():\n
 get_ipython().run_line_magic('matplotlib', 'inline')
 
 # Group by the submitter
-by_user = pulls.groupby("user").count()
+with stage('count by user', rows_in=len(pulls)) as s:
+    by_user = s.output(pulls.groupby("user").count())
 
 # Plot the histogram
-by_user.hist()
+with stage('plot by_user histogram'):
+    by_user.hist()
 
 
 # In[133]:
@@ -166,6 +199,18 @@ author_counts.nlargest(3,"pid")
 get_ipython().run_cell_magic('nose', '', "\n# one or more tests of the students code. \n# The @solution should pass the tests.\n# The purpose of the tests is to try to catch common errors and to \n# give the student a hint on how to resolve these errors.\n\ndef test_selecting_commits():\n    assert len(file_pr) == 30, \\\n    'You did not filter the data on the right file.'\n    \ndef test_author_counts():\n    assert len(author_counts) == 11, \\\n    'The number of authors is not correct.'")
 
 
+# In[ ]:
+
+
+# Index every directory level of the changed files once
+from path_trie import PathTrie
+trie = PathTrie.from_frames(pulls, pull_files)
+
+# The top 3 developers under the directory of that file, overall and in 2013
+directory = 'src/compiler/scala/reflect'
+trie.top_authors(directory, n=3), trie.top_authors(directory, year=2013, n=3)
+
+
 # ## 8. Who made the last ten pull requests on a given file?
 # <p>Open source projects suffer from fluctuating membership. This makes the problem of finding the right person more challenging: the person has to be knowledgeable <em>and</em> still be involved in the project. A person that contributed a lot in the past might no longer be available (or willing) to help. To get a better understanding, we need to investigate the more recent history of that particular part of the system. </p>
 # <p>Like in the previous task, we will look at the history of  <code>src/compiler/scala/reflect/reify/phases/Calculate.scala</code>.</p>
@@ -255,3 +300,13 @@ by_file_wide.plot(kind='bar')
 
 get_ipython().run_cell_magic('nose', '', "\n# one or more tests of the students code. \n# The @solution should pass the tests.\n# The purpose of the tests is to try to catch common errors and to \n# give the student a hint on how to resolve these errors.\n\ndef test_by_author():\n    assert len(by_author) == 16999, \\\n    'Selecting by author did not produce the expected results.'\n    \ndef test_by_file():\n    assert len(by_file) == 15, \\\n    'Selecting by file did not produce the expected results.'\n    \n# def test_grouped():\n#     assert len(grouped) == 4, \\\n#     'There should be only 3 years that matches our data.'\n    \ndef test_by_file_wide():\n    assert len(by_file_wide) == 3, \\\n    'There should be only 3 years that matches our data.'")
 
+
+# In[ ]:
+
+
+# The same tables for any list of authors from one (user, year, file) count cube
+from activity_cube import ActivityCube
+cube = ActivityCube(pulls, pull_files)
+
+cube.yearly(authors), cube.yearly(authors, file=file), cube.yearly(authors, directory='src/compiler/scala/reflect')
+
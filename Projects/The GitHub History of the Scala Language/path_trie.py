@@ -0,0 +1,127 @@
+"""Pull request activity rolled up at every directory level of the file paths.
+
+The notebook can only ask about one exact path (``data["file"] == file``).
+``PathTrie`` indexes ``pull_files`` by path component instead: every
+directory and file is a node, components and user names are interned to
+integer ids, and every node keeps the number of pull requests that touched
+something under it plus a ``(year, user) -> pull requests`` table. A pull
+request counts once per node however many of its files sit below it.
+
+"Top authors under ``src/compiler/scala/reflect`` in 2013" is then a walk
+down four nodes and a look at one table, without scanning the merged frame.
+The trie is built in one pass over the pull requests and can be appended to;
+pull requests already indexed are skipped.
+
+    trie = PathTrie.from_frames(pulls, pull_files)
+    trie.top_authors('src/compiler/scala/reflect', year=2013, n=3)
+"""
+from collections import Counter, defaultdict
+
+import pandas as pd
+
+
+class PathTrie:
+    """Trie of path components with per-node pull request counts and authors."""
+
+    def __init__(self, sep='/'):
+        self.sep = sep
+        self.component_ids = {}
+        self.components = []
+        self.user_ids = {}
+        self.users = []
+        # node 0 is the repository root
+        self.children = [{}]
+        self.prs = [0]
+        self.activity = [Counter()]
+        self.pids = set()
+
+    def _intern(self, ids, names, name):
+        if name not in ids:
+            ids[name] = len(names)
+            names.append(name)
+        return ids[name]
+
+    def _child(self, node, component):
+        children = self.children[node]
+        if component not in children:
+            children[component] = len(self.children)
+            self.children.append({})
+            self.prs.append(0)
+            self.activity.append(Counter())
+        return children[component]
+
+    def add_pull(self, pid, user, year, files):
+        """Index one pull request with all the files it changed."""
+        if pid in self.pids:
+            return False
+        self.pids.add(pid)
+        user = self._intern(self.user_ids, self.users, user)
+        touched = {0}
+        for path in files:
+            node = 0
+            for part in path.split(self.sep):
+                node = self._child(node, self._intern(self.component_ids, self.components, part))
+                touched.add(node)
+        for node in touched:
+            self.prs[node] += 1
+            self.activity[node][year, user] += 1
+        return True
+
+    def append(self, data):
+        """Index the pull requests of a merged frame (``pid``, ``user``, ``date``, ``file``).
+
+        Rows of one pull request must all be in the same call.
+        """
+        years = pd.to_datetime(data['date'], utc=True).dt.year
+        files = defaultdict(list)
+        owners = {}
+        for pid, user, year, path in zip(data['pid'], data['user'], years, data['file']):
+            files[pid].append(path)
+            owners[pid] = (user, year)
+        added = 0
+        for pid, paths in files.items():
+            user, year = owners[pid]
+            added += self.add_pull(pid, user, int(year), paths)
+        return added
+
+    @classmethod
+    def from_frames(cls, pulls, pull_files, sep='/'):
+        trie = cls(sep)
+        trie.append(pull_files.merge(pulls, on='pid'))
+        return trie
+
+    def node(self, path):
+        """Node id of a directory or file path (``''`` is the root)."""
+        node = 0
+        for part in filter(None, path.split(self.sep)):
+            component = self.component_ids.get(part)
+            if component is None or component not in self.children[node]:
+                raise KeyError(path)
+            node = self.children[node][component]
+        return node
+
+    def pr_count(self, path, year=None):
+        node = self.node(path)
+        if year is None:
+            return self.prs[node]
+        # a pull request has one year, so per-year counts add up
+        return sum(n for (y, _), n in self.activity[node].items() if y == year)
+
+    def authors(self, path, year=None):
+        """Pull requests per author under ``path`` (in ``year``), largest first."""
+        counts = Counter()
+        for (y, user), n in self.activity[self.node(path)].items():
+            if year is None or y == year:
+                counts[self.users[user]] += n
+        table = pd.Series(counts, name='prs', dtype='int64').rename_axis('user')
+        return table.sort_values(ascending=False, kind='stable')
+
+    def top_authors(self, path, year=None, n=3):
+        return self.authors(path, year).head(n)
+
+    def subdirectories(self, path=''):
+        """Pull request count of every child of ``path``, largest first."""
+        children = self.children[self.node(path)]
+        table = pd.Series({self.components[c]: self.prs[node] for c, node in children.items()},
+                          name='prs', dtype='int64').rename_axis('name')
+        return table.sort_values(ascending=False, kind='stable')
@@ -0,0 +1,243 @@
+"""Bounded-memory summaries of a stream of pull request events.
+
+The notebook answers "who submits the most pull requests" with
+``pulls.groupby("user").count()`` and "what are the latest pull requests"
+with ``pulls.nlargest(10, "pid")``, so the whole history has to be in one
+frame. ``PRStream`` keeps the same answers up to date one event at a time:
+
+* ``SpaceSaving`` tracks the top users and files with ``capacity`` counters.
+  Every item with more than ``n / capacity`` events is guaranteed to be
+  kept, and each count overestimates by at most its recorded error,
+* ``CountMin`` estimates the count of any user or file (also ones that fell
+  out of the top list) from a ``depth x width`` table, never underestimating,
+* ``LastN`` keeps the ``n`` largest pull request ids in a min-heap.
+
+Counters only grow, so ``SpaceSaving`` finds the smallest one with a lazily
+updated min-heap: an increment leaves the counter's heap entry as it is, and
+an entry that comes out of the heap with an old count is pushed back with
+the current one. Replacing a counter costs ``O(log capacity)`` amortized
+instead of a scan over all of them.
+
+Every summary has a ``merge`` method, so streams can be summarized
+separately (per day, per worker) and combined afterwards. The hashing is
+keyed, not Python's ``hash``, so sketches built in different processes
+merge correctly.
+
+    python pr_stream.py datasets/pulls.csv --files datasets/pull_files.csv --k 10 --capacity 100
+"""
+import argparse
+import hashlib
+import heapq
+import itertools
+
+import numpy as np
+import pandas as pd
+
+
+class SpaceSaving:
+    """Top-k tracker with ``capacity`` counters: item -> (count, error)."""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+        self.total = 0
+        # (count when pushed, insertion number, item); the number keeps items out of comparisons
+        self.heap = []
+        self.seq = itertools.count()
+
+    def _push(self, item):
+        heapq.heappush(self.heap, (self.counts[item], next(self.seq), item))
+
+    def _smallest(self):
+        """Heap entry of the smallest counter, after refreshing outdated entries on top."""
+        while self.heap[0][0] != self.counts[self.heap[0][2]]:
+            item = self.heap[0][2]
+            heapq.heapreplace(self.heap, (self.counts[item], next(self.seq), item))
+        return self.heap[0]
+
+    def add(self, item, count=1):
+        self.total += count
+        if item in self.counts:
+            self.counts[item] += count
+            return
+        if len(self.counts) < self.capacity:
+            self.counts[item] = count
+            self.errors[item] = 0
+            self._push(item)
+            return
+        # replace the smallest counter; the newcomer inherits its count as error
+        floor, _, smallest = self._smallest()
+        del self.counts[smallest], self.errors[smallest]
+        self.counts[item] = floor + count
+        self.errors[item] = floor
+        heapq.heapreplace(self.heap, (self.counts[item], next(self.seq), item))
+
+    def floor(self):
+        """Upper bound of the count of any item without a counter."""
+        return self._smallest()[0] if len(self.counts) == self.capacity else 0
+
+    def merge(self, other):
+        """Combine with a summary of another stream (Agarwal et al.'s merge)."""
+        mine, theirs = self.floor(), other.floor()
+        counts, errors = {}, {}
+        for item in set(self.counts) | set(other.counts):
+            counts[item] = self.counts.get(item, mine) + other.counts.get(item, theirs)
+            errors[item] = self.errors.get(item, mine) + other.errors.get(item, theirs)
+        kept = heapq.nlargest(self.capacity, counts, key=counts.get)
+        self.counts = {item: counts[item] for item in kept}
+        self.errors = {item: errors[item] for item in kept}
+        self.heap = [(self.counts[item], next(self.seq), item) for item in kept]
+        heapq.heapify(self.heap)
+        self.total += other.total
+        return self
+
+    def top(self, k):
+        """The ``k`` largest counters as a frame with ``count``, ``error`` and ``guaranteed``."""
+        items = heapq.nlargest(k, self.counts, key=self.counts.get)
+        counts = [self.counts[i] for i in items]
+        errors = [self.errors[i] for i in items]
+        table = pd.DataFrame({'count': counts, 'error': errors}, index=pd.Index(items, name='item'))
+        # an item is surely in the top k if its lower bound beats the (k+1)-th count
+        rest = heapq.nlargest(k + 1, self.counts.values())
+        threshold = rest[k] if len(rest) > k else self.floor()
+        table['guaranteed'] = table['count'] - table['error'] >= threshold
+        return table
+
+
+class CountMin:
+    """Count-Min sketch; estimates never fall below the true count."""
+
+    def __init__(self, width=2048, depth=4, seed=0):
+        self.width, self.depth, self.seed = width, depth, seed
+        self.table = np.zeros((depth, width), dtype=np.int64)
+        self.key = seed.to_bytes(16, 'little')
+
+    def _columns(self, item):
+        digest = hashlib.blake2b(str(item).encode(), digest_size=16, key=self.key).digest()
+        h1, h2 = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.width for i in range(self.depth)]
+
+    def add(self, item, count=1):
+        self.table[np.arange(self.depth), self._columns(item)] += count
+
+    def estimate(self, item):
+        return int(self.table[np.arange(self.depth), self._columns(item)].min())
+
+    def merge(self, other):
+        if (other.width, other.depth, other.seed) != (self.width, self.depth, self.seed):
+            raise ValueError('only sketches with the same width, depth and seed can be merged')
+        self.table += other.table
+        return self
+
+
+class LastN:
+    """The ``n`` largest keys seen (e.g. pull request ids) with their payloads."""
+
+    def __init__(self, n):
+        self.n = n
+        # (key, insertion number, payload); equal keys never compare payloads
+        self.heap = []
+        self.seq = itertools.count()
+
+    def add(self, key, payload=None):
+        if len(self.heap) < self.n:
+            heapq.heappush(self.heap, (key, next(self.seq), payload))
+        elif key > self.heap[0][0]:
+            heapq.heapreplace(self.heap, (key, next(self.seq), payload))
+
+    def merge(self, other):
+        for key, _, payload in sorted(other.heap):
+            self.add(key, payload)
+        return self
+
+    def items(self):
+        """``(key, payload)`` pairs, largest key first."""
+        ordered = sorted(self.heap, key=lambda entry: entry[:2], reverse=True)
+        return [(key, payload) for key, _, payload in ordered]
+
+
+class PRStream:
+    """Top users, top files, count estimates and the last pull requests of a stream."""
+
+    def __init__(self, capacity=100, last=10, width=2048, depth=4, seed=0):
+        self.users = SpaceSaving(capacity)
+        self.files = SpaceSaving(capacity)
+        self.user_counts = CountMin(width, depth, seed)
+        self.file_counts = CountMin(width, depth, seed)
+        self.last = LastN(last)
+
+    def add_pull(self, pid, user, date=None):
+        self.users.add(user)
+        self.user_counts.add(user)
+        self.last.add(pid, (user, date))
+
+    def add_file(self, pid, file):
+        self.files.add(file)
+        self.file_counts.add(file)
+
+    def add_pulls(self, pulls):
+        for pid, user, date in pulls[['pid', 'user', 'date']].itertuples(index=False):
+            self.add_pull(pid, user, date)
+
+    def add_files(self, pull_files):
+        for pid, file in pull_files[['pid', 'file']].itertuples(index=False):
+            self.add_file(pid, file)
+
+    def merge(self, other):
+        self.users.merge(other.users)
+        self.files.merge(other.files)
+        self.user_counts.merge(other.user_counts)
+        self.file_counts.merge(other.file_counts)
+        self.last.merge(other.last)
+        return self
+
+
+def accuracy(summary, counts, sketch, k):
+    """How well a top-k summary and a Count-Min sketch match exact ``counts``."""
+    exact = counts.nlargest(k)
+    top = summary.top(k)
+    errors = np.array([sketch.estimate(item) - n for item, n in counts.items()])
+    return {
+        'top_k_recall': len(set(top.index) & set(exact.index)) / k,
+        'max_top_count_error': int((top['count'] - counts.reindex(top.index, fill_value=0)).abs().max()),
+        'countmin_max_overestimate': int(errors.max()),
+        'countmin_exact_share': float((errors == 0).mean()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check streaming PR summaries against exact groupbys.')
+    parser.add_argument('pulls', help='pulls.csv (pid, user, date)')
+    parser.add_argument('--files', help='pull_files.csv (pid, file)')
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--capacity', type=int, default=100)
+    parser.add_argument('--width', type=int, default=2048)
+    parser.add_argument('--parts', type=int, default=4, help='summarize this many slices separately, then merge')
+    args = parser.parse_args()
+
+    pulls = pd.read_csv(args.pulls)
+    pull_files = pd.read_csv(args.files) if args.files else None
+
+    streams = []
+    for part in np.array_split(np.arange(len(pulls)), args.parts):
+        stream = PRStream(args.capacity, args.k, args.width)
+        stream.add_pulls(pulls.iloc[part])
+        if pull_files is not None:
+            stream.add_files(pull_files[pull_files['pid'].isin(pulls['pid'].iloc[part])])
+        streams.append(stream)
+    merged = streams[0]
+    for stream in streams[1:]:
+        merged.merge(stream)
+
+    print('users:', accuracy(merged.users, pulls.groupby('user')['pid'].count(), merged.user_counts, args.k))
+    print(merged.users.top(args.k))
+    if pull_files is not None:
+        print('files:', accuracy(merged.files, pull_files.groupby('file')['pid'].count(), merged.file_counts, args.k))
+        print(merged.files.top(args.k))
+    last = [pid for pid, _ in merged.last.items()]
+    print('last {} pids match nlargest: {}'.format(args.k, last == pulls.nlargest(args.k, 'pid')['pid'].tolist()))
+
+
+if __name__ == '__main__':
+    main()
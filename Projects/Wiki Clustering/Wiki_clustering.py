@@ -11,15 +11,29 @@ from sklearn.pipeline import make_pipeline
 import pandas as pd
 from scipy.sparse import csr_matrix
 
-df = pd.read_csv('wikipedia-vectors.csv', index_col=0)
+import sys
+sys.path.append('..')
+from common.trace import stage
+from common.cache import StageCache
+
+# Outputs of the slow steps, reused while their inputs and code are unchanged
+cache = StageCache()
+
+with stage('read wikipedia-vectors.csv') as s:
+    df = s.output(pd.read_csv('wikipedia-vectors.csv', index_col=0))
 articles = csr_matrix(df.transpose())
 titles = list(df.columns)
 
-svd = TruncatedSVD(n_components=50)
-kmeans = KMeans(n_clusters=6)
-pipeline = make_pipeline(svd, kmeans)
-pipeline.fit(articles)
-labels = pipeline.predict(articles)
+@cache.stage('wiki svd kmeans')
+def cluster_articles(articles, n_components, n_clusters):
+    svd = TruncatedSVD(n_components=n_components)
+    kmeans = KMeans(n_clusters=n_clusters)
+    pipeline = make_pipeline(svd, kmeans)
+    pipeline.fit(articles)
+    return pipeline, pipeline.predict(articles)
+
+with stage('fit SVD + KMeans', rows_in=articles.shape[0]):
+    pipeline, labels = cluster_articles(articles, 50, 6)
 df = pd.DataFrame({'label': labels, 'article': titles})
 print(df.sort_values('label'))
 
@@ -28,8 +42,9 @@ print(df.sort_values('label'))
 from sklearn.decomposition import NMF
 
 model = NMF(n_components=6)
-model.fit(articles)
-nmf_features = model.transform(articles)
+with stage('fit NMF', rows_in=articles.shape[0]) as s:
+    model.fit(articles)
+    nmf_features = s.output(model.transform(articles))
 print(nmf_features)
 df = pd.DataFrame(nmf_features, index=titles)
 print(df.loc['Anne Hathaway'])
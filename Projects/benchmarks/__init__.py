@@ -0,0 +1,4 @@
+"""Micro-benchmarks for the shared helpers in ``common``.
+
+Run from the ``Projects`` directory, e.g. ``python -m benchmarks.bench_groups``.
+"""
@@ -0,0 +1,51 @@
+"""Compare ``groupby.filter`` with ``common.groups.filter_group_size``.
+
+    python -m benchmarks.bench_groups --rows 1000000 --groups 10 1000 100000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from common.groups import filter_group_size
+
+
+def make_frame(n_rows, n_groups, seed=0):
+    rng = np.random.default_rng(seed)
+    # Zipf-like group sizes so that some groups pass the threshold and some don't
+    weights = 1.0 / np.arange(1, n_groups + 1)
+    keys = rng.choice(n_groups, size=n_rows, p=weights / weights.sum())
+    return pd.DataFrame({'key': keys.astype(str), 'value': rng.random(n_rows)})
+
+
+def best_of(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--groups', type=int, nargs='+', default=[10, 1000, 10000, 100000])
+    parser.add_argument('--min-size', type=int, default=5)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print('{:>10s} {:>12s} {:>12s} {:>9s}'.format('groups', 'filter (s)', 'vector (s)', 'speedup'))
+    for n_groups in args.groups:
+        df = make_frame(args.rows, n_groups)
+        slow, expected = best_of(
+            lambda: df.groupby('key').filter(lambda x: len(x) >= args.min_size), args.repeat)
+        fast, result = best_of(
+            lambda: filter_group_size(df, 'key', min_size=args.min_size), args.repeat)
+        assert result.equals(expected)
+        print('{:>10d} {:>12.4f} {:>12.4f} {:>8.1f}x'.format(n_groups, slow, fast, slow / fast))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""Run the benchmarks in ``benchmarks.suite`` and compare with earlier runs.
+
+    python -m benchmarks.run --scales 1 10 100
+    python -m benchmarks.run --bench Liver --scales 1 10 --repeat 5
+
+Each run is stored as ``benchmarks/results/<timestamp>-<commit>.json``; the
+timings of the previous stored run are printed next to the new ones. The
+timings depend on the machine, so the results directory is not committed.
+"""
+import argparse
+import glob
+import inspect
+import json
+import os
+import platform
+import subprocess
+import time
+
+from benchmarks import suite
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       cwd=os.path.dirname(RESULTS_DIR), text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def benchmark_classes(pattern=None):
+    for name, cls in inspect.getmembers(suite, inspect.isclass):
+        if cls.__module__ != suite.__name__:
+            continue
+        if pattern and pattern.lower() not in name.lower():
+            continue
+        yield name, cls
+
+
+def time_call(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def run(scales, pattern=None, repeat=3):
+    results = {}
+    for name, cls in benchmark_classes(pattern):
+        methods = [m for m in dir(cls) if m.startswith('time_')]
+        for scale in scales:
+            bench = cls()
+            try:
+                bench.setup(scale)
+            except NotImplementedError as e:
+                print('{} [x{}] skipped: {}'.format(name, scale, e))
+                continue
+            for method in methods:
+                key = '{}.{}[x{}]'.format(name, method, scale)
+                seconds = time_call(lambda: getattr(bench, method)(scale), repeat)
+                results[key] = seconds
+                print('{:<60s} {:10.4f} s'.format(key, seconds))
+    return results
+
+
+def previous_results():
+    paths = sorted(glob.glob(os.path.join(RESULTS_DIR, '*.json')))
+    if not paths:
+        return None, {}
+    with open(paths[-1]) as f:
+        return paths[-1], json.load(f)['results']
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the project benchmarks at several data scales.')
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--bench', help='only run classes whose name contains this')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--no-save', action='store_true')
+    args = parser.parse_args()
+
+    previous_path, previous = previous_results()
+    results = run(args.scales, args.bench, args.repeat)
+
+    if previous:
+        print('\ncompared with {}:'.format(os.path.basename(previous_path)))
+        for key, seconds in results.items():
+            if key in previous:
+                print('{:<60s} {:10.4f} s -> {:10.4f} s ({:+.1%})'.format(
+                    key, previous[key], seconds, seconds / previous[key] - 1))
+
+    if not args.no_save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        commit = git_commit()
+        path = os.path.join(RESULTS_DIR, '{}-{}.json'.format(time.strftime('%Y%m%dT%H%M%S'), commit))
+        with open(path, 'w') as f:
+            json.dump({'commit': commit, 'python': platform.python_version(),
+                       'machine': platform.node(), 'results': results}, f, indent=1)
+        print('\nsaved', path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,207 @@
+"""asv-style benchmarks of the key operations of each project.
+
+Every class is parametrized by ``scale``: the benchmark reads the synthetic
+replica with ``scale`` times the rows of the original dataset (see
+``common.synth``), generating it on first use. Methods named ``time_*`` are
+timed after ``setup``. As in asv, ``setup`` raises ``NotImplementedError``
+to skip a benchmark, which happens when the original dataset is not in the
+tree (``police.csv``, ``pull_files.csv``).
+
+The classes follow asv's conventions so the module can be pointed at by
+asv directly; ``python -m benchmarks.run`` runs them without asv and keeps
+the results for comparison across runs.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import random as sparse_random
+
+from common import synth
+from common.groups import filter_group_size
+from common.histboost import HistGradientBoosting, load_binned
+
+SCALES = [1, 10, 100, 1000]
+
+
+def replica(name, scale):
+    try:
+        return synth.ensure_replica(name, scale)
+    except FileNotFoundError:
+        raise NotImplementedError('{} is not in the tree'.format(name))
+
+
+class GooglePlayCleaning:
+    params = SCALES
+    param_names = ['scale']
+
+    def setup(self, scale):
+        self.path = replica('apps', scale)
+        self.apps = pd.read_csv(self.path).drop_duplicates()
+
+    def time_read_csv(self, scale):
+        pd.read_csv(self.path)
+
+    def time_drop_duplicates(self, scale):
+        self.apps.drop_duplicates()
+
+    def time_clean_columns(self, scale):
+        apps = self.apps.copy()
+        for col in ['Installs', 'Size', 'Price']:
+            for char in ['+', ',', 'M', '$']:
+                apps[col] = apps[col].str.replace(char, '')
+            apps[col] = pd.to_numeric(apps[col], errors='coerce')
+
+    def time_large_categories(self, scale):
+        filter_group_size(self.apps, 'Category', min_size=250)
+
+
+class PoliceRateTables:
+    params = SCALES
+    param_names = ['scale']
+
+    def setup(self, scale):
+        ri = pd.read_csv(replica('police', scale))
+        ri.dropna(subset=['driver_gender'], inplace=True)
+        ri['is_arrested'] = ri.is_arrested.astype(bool)
+        ri['stop_datetime'] = pd.to_datetime(ri.stop_date.str.cat(ri.stop_time, sep=' '))
+        self.ri = ri.set_index('stop_datetime')
+
+    def time_search_rate_by_gender(self, scale):
+        self.ri.groupby(['violation', 'driver_gender']).search_conducted.mean()
+
+    def time_hourly_arrest_rate(self, scale):
+        self.ri.groupby(self.ri.index.hour).is_arrested.mean()
+
+    def time_annual_drug_rate(self, scale):
+        self.ri.drugs_related_stop.resample('YE').mean()
+
+    def time_district_crosstab(self, scale):
+        pd.crosstab(self.ri.district, self.ri.violation)
+
+
+class WeatherRating:
+    params = SCALES
+    param_names = ['scale']
+
+    def setup(self, scale):
+        self.weather = pd.read_csv(replica('weather', scale))
+
+    def time_rating(self, scale):
+        bad = self.weather.loc[:, 'WT01':'WT22'].sum(axis='columns').fillna(0).astype('int')
+        mapping = {0: 'good', 1: 'bad', 2: 'bad', 3: 'bad', 4: 'bad',
+                   5: 'worse', 6: 'worse', 7: 'worse', 8: 'worse', 9: 'worse'}
+        cats = pd.CategoricalDtype(['good', 'bad', 'worse'], ordered=True)
+        bad.map(mapping).astype(cats)
+
+
+class ScalaPulls:
+    params = SCALES
+    param_names = ['scale']
+
+    def setup(self, scale):
+        pulls_one = pd.read_csv(replica('pulls_2011-2013', scale))
+        pulls_two = pd.read_csv(replica('pulls_2014-2018', scale))
+        self.pulls = pd.concat([pulls_one, pulls_two])
+        self.pulls['date'] = pd.to_datetime(self.pulls['date'], utc=True)
+
+    def time_user_counts(self, scale):
+        self.pulls.groupby('user').count()
+
+    def time_last_10(self, scale):
+        self.pulls.nlargest(10, 'pid')
+
+    def time_author_year_pivot(self, scale):
+        by_author = self.pulls[self.pulls['user'].isin(['xeno-by', 'soc'])]
+        counts = by_author.groupby(['user', by_author['date'].dt.year]).agg({'pid': 'count'}).reset_index()
+        counts.pivot_table(index='date', columns='user', values='pid', fill_value=0)
+
+
+class ScalaMerge:
+    params = SCALES
+    param_names = ['scale']
+
+    def setup(self, scale):
+        pulls_one = pd.read_csv(replica('pulls_2011-2013', scale))
+        pulls_two = pd.read_csv(replica('pulls_2014-2018', scale))
+        self.pulls = pd.concat([pulls_one, pulls_two])
+        self.pulls['date'] = pd.to_datetime(self.pulls['date'], utc=True)
+        self.pull_files = pd.read_csv(replica('pull_files', scale))
+        self.data = pd.merge(self.pulls, self.pull_files, on='pid')
+
+    def time_merge(self, scale):
+        pd.merge(self.pulls, self.pull_files, on='pid')
+
+    def time_month_year_counts(self, scale):
+        date = pd.DatetimeIndex(self.data['date'])
+        month_year = date.year.astype(str) + date.month.astype(str)
+        self.data.groupby(month_year).count()
+
+
+class WikiClustering:
+    params = SCALES
+    param_names = ['scale']
+    timeout = 600
+
+    def setup(self, scale):
+        # wikipedia-vectors.csv is a words x articles tf-idf matrix; scale the
+        # number of articles and keep the density and the non-zero values
+        words = pd.read_csv(os.path.join(synth.PROJECTS_DIR, 'Wiki Clustering', 'wikipedia-vectors.csv'),
+                            index_col=0)
+        values = words.to_numpy()
+        nonzero = values[values != 0]
+        density = len(nonzero) / values.size
+        n_articles = words.shape[1] * scale
+        rng = np.random.default_rng(0)
+        self.articles = sparse_random(
+            n_articles, words.shape[0], density=density, format='csr', random_state=0,
+            data_rvs=lambda n: rng.choice(nonzero, size=n))
+
+    def time_svd_kmeans(self, scale):
+        from sklearn.cluster import KMeans
+        from sklearn.decomposition import TruncatedSVD
+        from sklearn.pipeline import make_pipeline
+
+        pipeline = make_pipeline(TruncatedSVD(n_components=50), KMeans(n_clusters=6, n_init=10))
+        pipeline.fit(self.articles)
+
+
+class LiverBoosting:
+    params = SCALES
+    param_names = ['scale']
+    timeout = 1200
+
+    def setup(self, scale):
+        path = replica('liver', scale)
+        ds = pd.read_csv(path, index_col=0)
+        self.X = ds.iloc[:, :10]
+        self.y = ds.iloc[:, -1]
+        self.codes, _ = load_binned(path + '.bins.npz', self.X.values)
+
+    def time_adaboost(self, scale):
+        from sklearn.ensemble import AdaBoostClassifier
+        from sklearn.tree import DecisionTreeClassifier
+
+        dt = DecisionTreeClassifier(max_depth=2, random_state=1)
+        AdaBoostClassifier(dt, n_estimators=180, random_state=1).fit(self.X, self.y)
+
+    def time_gradient_boosting(self, scale):
+        from sklearn.ensemble import GradientBoostingRegressor
+
+        GradientBoostingRegressor(max_depth=4, n_estimators=200, random_state=2).fit(self.X, self.y)
+
+    def time_stochastic_gradient_boosting(self, scale):
+        from sklearn.ensemble import GradientBoostingRegressor
+
+        GradientBoostingRegressor(max_depth=4, subsample=0.9, max_features=0.75,
+                                  n_estimators=200, random_state=2).fit(self.X, self.y)
+
+    def time_binned_gradient_boosting(self, scale):
+        HistGradientBoosting(max_depth=4, n_estimators=200, random_state=2).fit(self.codes, self.y)
+
+    def time_binned_stochastic_gradient_boosting(self, scale):
+        HistGradientBoosting(max_depth=4, subsample=0.9, max_features=0.75,
+                             n_estimators=200, random_state=2).fit(self.codes, self.y)
+
+    def time_binned_log_loss_boosting(self, scale):
+        HistGradientBoosting(loss='log_loss', max_depth=4, n_estimators=200, random_state=2).fit(self.codes, self.y)
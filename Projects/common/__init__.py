@@ -0,0 +1,6 @@
+"""Shared helpers for the DataCamp project notebooks and scripts.
+
+The project folders are run from their own directory (they read
+``datasets/...`` or ``data/...`` relative paths), so they pick this package
+up with ``sys.path.append('..')``.
+"""
@@ -0,0 +1,202 @@
+"""Bagged decision trees fitted in a process pool, scored out of bag.
+
+``BaggingClassifier`` in ``ensemble.py`` fits its trees one after another
+and is scored on a held-out split. Here:
+
+* all bootstrap samples are drawn up front as one ``(n_estimators, n_draws)``
+  matrix of row indices in the smallest unsigned dtype that holds them,
+* every tree is fitted with the bootstrap counts as sample weights, as
+  ``BaggingClassifier`` does. With ``processes=N`` (``None`` for one per
+  CPU), ``X_train``/``y_train`` are copied once into shared memory and pool
+  workers attach to it and fit their chunk of trees,
+* the fitted trees come back as plain arrays and are stacked into
+  ``StackedTrees``, padded ``(n_trees, max_nodes)`` node tables. Prediction
+  walks every tree and sample at once, one step per tree level, instead of
+  looping over estimators,
+* the out-of-bag accuracy uses the training predictions of that one pass,
+  masked by the rows each tree never drew.
+
+    bag = SharedBagging(n_estimators=50, random_state=1).fit(X_train, y_train)
+    bag.oob_score_, bag.predict(X_test)
+
+The default ``processes=1`` fits in-process. Pool workers are started with
+spawn on Windows and macOS and re-import the calling script, so only ask
+for a pool from code behind an ``if __name__ == '__main__':`` guard.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+from sklearn.tree import DecisionTreeClassifier
+
+# cells of the (trees x samples) node matrix walked at once when predicting
+BLOCK_CELLS = 1 << 22
+
+_shared = {}
+
+
+def bootstrap_indices(n_samples, n_estimators, n_draws=None, random_state=None):
+    """``(n_estimators, n_draws)`` bootstrap row indices in a compact dtype."""
+    rng = np.random.default_rng(random_state)
+    n_draws = n_samples if n_draws is None else n_draws
+    dtype = np.min_scalar_type(max(n_samples - 1, 0))
+    return rng.integers(0, n_samples, size=(n_estimators, n_draws), dtype=np.int64).astype(dtype)
+
+
+def _to_shared(array):
+    shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, array.dtype, buffer=shm.buf)[...] = array
+    return shm, (shm.name, array.shape, array.dtype.str)
+
+
+def _attach(spec):
+    name, shape, dtype = spec
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype, buffer=shm.buf)
+
+
+def _init_worker(x_spec, y_spec):
+    _shared['x_shm'], _shared['X'] = _attach(x_spec)
+    _shared['y_shm'], _shared['y'] = _attach(y_spec)
+
+
+def tree_arrays(tree, n_classes):
+    """Node table of a fitted tree: feature, threshold, children and class probabilities.
+
+    Leaves point to themselves, so walking further down is a no-op.
+    """
+    t = tree.tree_
+    nodes = np.arange(t.node_count)
+    leaf = t.children_left == -1
+    value = np.zeros((t.node_count, n_classes), dtype=np.float32)
+    # the tree only knows the class codes present in its sample
+    value[:, tree.classes_.astype(np.intp)] = t.value[:, 0, :]
+    value /= value.sum(axis=1, keepdims=True)
+    return (np.where(leaf, 0, t.feature).astype(np.int32),
+            np.where(leaf, np.inf, t.threshold),
+            np.where(leaf, nodes, t.children_left).astype(np.int32),
+            np.where(leaf, nodes, t.children_right).astype(np.int32),
+            value,
+            int(t.max_depth))
+
+
+def _fit_chunk(rows, seeds, n_classes, tree_params, X=None, y=None):
+    if X is None:
+        X, y = _shared['X'], _shared['y']
+    fitted = []
+    for sample, seed in zip(rows, seeds):
+        weights = np.bincount(sample, minlength=len(y)).astype(np.float64)
+        used = weights > 0
+        tree = DecisionTreeClassifier(random_state=seed, **tree_params)
+        tree.fit(X[used], y[used], sample_weight=weights[used])
+        fitted.append(tree_arrays(tree, n_classes))
+    return fitted
+
+
+class StackedTrees:
+    """Array-backed forest: padded node tables of all trees side by side."""
+
+    def __init__(self, arrays, n_classes):
+        n_trees = len(arrays)
+        width = max(len(a[0]) for a in arrays)
+        self.feature = np.zeros((n_trees, width), dtype=np.int32)
+        self.threshold = np.full((n_trees, width), np.inf)
+        self.left = np.zeros((n_trees, width), dtype=np.int32)
+        self.right = np.zeros((n_trees, width), dtype=np.int32)
+        self.value = np.zeros((n_trees, width, n_classes), dtype=np.float32)
+        for i, (feature, threshold, left, right, value, _) in enumerate(arrays):
+            n = len(feature)
+            self.feature[i, :n], self.threshold[i, :n] = feature, threshold
+            self.left[i, :n], self.right[i, :n], self.value[i, :n] = left, right, value
+        self.depth = max(a[5] for a in arrays)
+
+    def __len__(self):
+        return len(self.feature)
+
+    def apply(self, X):
+        """Leaf id of every sample in every tree, shape ``(n_trees, n_samples)``."""
+        X = np.asarray(X, dtype=np.float32)
+        trees = np.arange(len(self))[:, None]
+        samples = np.arange(len(X))[None, :]
+        node = np.zeros((len(self), len(X)), dtype=np.int32)
+        for _ in range(self.depth):
+            # scikit-learn compares float32 features with the stored thresholds
+            go_left = X[samples, self.feature[trees, node]] <= self.threshold[trees, node]
+            node = np.where(go_left, self.left[trees, node], self.right[trees, node])
+        return node
+
+    def tree_proba(self, X):
+        """Blocks of ``(start, per-tree class probabilities)`` over the samples of ``X``."""
+        block = max(1, BLOCK_CELLS // len(self))
+        trees = np.arange(len(self))[:, None]
+        for start in range(0, len(X), block):
+            yield start, self.value[trees, self.apply(X[start:start + block])]
+
+    def predict_proba(self, X):
+        proba = np.empty((len(X), self.value.shape[2]))
+        for start, p in self.tree_proba(X):
+            proba[start:start + p.shape[1]] = p.mean(axis=0)
+        return proba
+
+
+class SharedBagging:
+    """Bootstrap-aggregated decision trees fitted in parallel over shared memory."""
+
+    def __init__(self, n_estimators=50, max_samples=1.0, processes=1, random_state=None, **tree_params):
+        self.n_estimators = n_estimators
+        self.max_samples = max_samples
+        self.processes = processes
+        self.random_state = random_state
+        self.tree_params = tree_params
+
+    def fit(self, X, y):
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        self.classes_, y_codes = np.unique(np.asarray(y), return_inverse=True)
+        n_classes = len(self.classes_)
+        n_draws = int(round(self.max_samples * len(X))) if isinstance(self.max_samples, float) else self.max_samples
+        rng = np.random.default_rng(self.random_state)
+        self.indices_ = bootstrap_indices(len(X), self.n_estimators, n_draws, rng)
+        seeds = rng.integers(0, 2 ** 31 - 1, size=self.n_estimators)
+
+        processes = self.processes or os.cpu_count()
+        if processes == 1:
+            arrays = _fit_chunk(self.indices_, seeds, n_classes, self.tree_params, X, y_codes)
+        else:
+            arrays = self._fit_pool(X, y_codes, seeds, n_classes, processes)
+        self.forest_ = StackedTrees(arrays, n_classes)
+        self.oob_score_ = self._oob_score(X, y_codes)
+        return self
+
+    def _fit_pool(self, X, y_codes, seeds, n_classes, processes):
+        x_shm, x_spec = _to_shared(X)
+        y_shm, y_spec = _to_shared(y_codes.astype(np.int64))
+        try:
+            chunks = np.array_split(np.arange(self.n_estimators), min(processes * 4, self.n_estimators))
+            with ProcessPoolExecutor(processes, initializer=_init_worker, initargs=(x_spec, y_spec)) as pool:
+                futures = [pool.submit(_fit_chunk, self.indices_[c], seeds[c], n_classes, self.tree_params)
+                           for c in chunks]
+                return [tree for f in futures for tree in f.result()]
+        finally:
+            for shm in (x_shm, y_shm):
+                shm.close()
+                shm.unlink()
+
+    def _oob_score(self, X, y_codes):
+        """Accuracy of the trees' votes on the rows they did not draw (NaN if none)."""
+        in_bag = np.zeros((self.n_estimators, len(X)), dtype=bool)
+        in_bag[np.arange(self.n_estimators)[:, None], self.indices_] = True
+        votes = np.zeros((len(X), len(self.classes_)))
+        for start, p in self.forest_.tree_proba(X):
+            out = ~in_bag[:, start:start + p.shape[1], None]
+            votes[start:start + p.shape[1]] = (p * out).sum(axis=0)
+        scored = votes.sum(axis=1) > 0
+        if not scored.any():
+            return np.nan
+        return (votes[scored].argmax(axis=1) == y_codes[scored]).mean()
+
+    def predict_proba(self, X):
+        return self.forest_.predict_proba(X)
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
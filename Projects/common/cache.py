@@ -0,0 +1,299 @@
+"""Content-addressed cache of stage outputs, shared by every project.
+
+Each run starts again from the raw csv files, so editing a plot at the end
+of a notebook still redoes the Google Play cleaning, the police datetime
+parse or the Wiki SVD. A stage here is a function whose arguments are its
+inputs::
+
+    cache = StageCache()
+
+    @cache.stage('clean apps')
+    def clean_apps(apps, cols, chars):
+        ...
+        return apps
+
+    apps = clean_apps(apps, ['Installs', 'Size', 'Price'], ['+', ',', 'M', '$'])
+
+The key of a call hashes the stage name, the function's bytecode and
+constants, an optional ``version`` and the content of every argument:
+frames through ``hash_pandas_object`` (plus the categories and order of
+categorical dtypes, which it does not see), arrays and sparse matrices through
+their buffers and ``File(path)`` through the file's bytes. The output of a
+downstream stage is an input of the next one, so after editing a late
+stage only that stage and the ones fed by it miss. Helpers and globals a
+stage reads are not part of the key: pass them in or bump ``version``.
+Stages must return what they compute rather than modify their arguments,
+since a hit does not run them.
+
+Outputs are written to one directory per key (a returned tuple is stored
+element by element): frames as Parquet when ``pyarrow`` is installed and
+every column name is a string (pickle otherwise, or if Parquet cannot
+hold a column), arrays as ``.npy``,
+sparse matrices as ``.npz`` and anything else (fitted models, lists) with
+joblib. Once the cache is over ``max_bytes`` the entries used longest ago
+are removed. ``PROJECTS_CACHE=off`` runs every stage without the cache;
+from ``Projects``::
+
+    python -m common.cache           # entries, most recently used first
+    python -m common.cache --clear
+"""
+import argparse
+import functools
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import time
+import types
+
+import joblib
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+try:
+    import pyarrow  # noqa: F401
+    HAVE_PARQUET = True
+except ImportError:
+    HAVE_PARQUET = False
+
+PROJECTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_PATH = os.path.join(PROJECTS_DIR, '.stage_cache')
+MAX_BYTES = 2 * 2 ** 30
+MISSING = object()
+
+
+class File:
+    """A path input that is keyed by the content of the file, not its name."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def __repr__(self):
+        return 'File({!r})'.format(self.path)
+
+
+def _code_digest(code, h):
+    h.update(code.co_code)
+    h.update(repr((code.co_names, code.co_varnames)).encode())
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            _code_digest(const, h)
+        else:
+            h.update(repr(const).encode())
+
+
+def _dtype_key(dtype):
+    # str() of every categorical is just 'category'
+    if isinstance(dtype, pd.CategoricalDtype):
+        return ('category', list(dtype.categories), str(dtype.categories.dtype), dtype.ordered)
+    return str(dtype)
+
+
+def _digest(obj, h):
+    """Feed the content of one stage input into the hash ``h``."""
+    h.update(type(obj).__name__.encode())
+    if isinstance(obj, (pd.DataFrame, pd.Series, pd.Index)):
+        layout = (list(obj.columns), [_dtype_key(d) for d in obj.dtypes]) if isinstance(obj, pd.DataFrame) \
+            else (obj.name, _dtype_key(obj.dtype))
+        h.update(repr((layout, obj.shape)).encode())
+        try:
+            h.update(pd.util.hash_pandas_object(obj, index=not isinstance(obj, pd.Index)).to_numpy().tobytes())
+        except TypeError:
+            # unhashable cells (lists, dicts)
+            h.update(pickle.dumps(obj, protocol=4))
+    elif isinstance(obj, np.ndarray):
+        h.update(repr((obj.dtype.str, obj.shape)).encode())
+        h.update(pickle.dumps(obj, protocol=4) if obj.dtype == object else np.ascontiguousarray(obj).tobytes())
+    elif sparse.issparse(obj):
+        csr = sparse.csr_array(obj)
+        h.update(repr((obj.format, csr.dtype.str, csr.shape)).encode())
+        for part in (csr.data, csr.indices, csr.indptr):
+            h.update(np.ascontiguousarray(part).tobytes())
+    elif isinstance(obj, File):
+        with open(obj.path, 'rb') as f:
+            for block in iter(functools.partial(f.read, 2 ** 20), b''):
+                h.update(block)
+    elif isinstance(obj, (list, tuple)):
+        h.update(str(len(obj)).encode())
+        for item in obj:
+            _digest(item, h)
+    elif isinstance(obj, dict):
+        h.update(str(len(obj)).encode())
+        for key in sorted(obj, key=repr):
+            h.update(repr(key).encode())
+            _digest(obj[key], h)
+    elif obj is None or isinstance(obj, (str, bytes, int, float, bool, np.generic)):
+        h.update(repr(obj).encode())
+    else:
+        h.update(pickle.dumps(obj, protocol=4))
+
+
+def _save(obj, base):
+    """Write one output next to ``base`` and return the file name used."""
+    if isinstance(obj, pd.DataFrame) and HAVE_PARQUET and all(isinstance(c, str) for c in obj.columns):
+        path = base + '.parquet'
+        try:
+            obj.to_parquet(path)
+            return os.path.basename(path)
+        except (ValueError, TypeError, NotImplementedError):
+            # columns Arrow cannot convert (mixed objects, unsupported extension types)
+            if os.path.exists(path):
+                os.remove(path)
+    if isinstance(obj, (pd.DataFrame, pd.Series, pd.Index)):
+        path = base + '.pkl'
+        pd.to_pickle(obj, path)
+    elif isinstance(obj, np.ndarray) and obj.dtype != object:
+        path = base + '.npy'
+        np.save(path, obj)
+    elif sparse.issparse(obj):
+        path = base + '.npz'
+        sparse.save_npz(path, obj)
+    else:
+        path = base + '.joblib'
+        joblib.dump(obj, path)
+    return os.path.basename(path)
+
+
+def _load(path):
+    ext = os.path.splitext(path)[1]
+    if ext == '.parquet':
+        return pd.read_parquet(path)
+    if ext == '.pkl':
+        return pd.read_pickle(path)
+    if ext == '.npy':
+        return np.load(path)
+    if ext == '.npz':
+        return sparse.load_npz(path)
+    return joblib.load(path)
+
+
+def _size(directory):
+    return sum(os.path.getsize(os.path.join(directory, f)) for f in os.listdir(directory))
+
+
+class StageCache:
+    """Directory of stage outputs keyed by input content, code and parameters."""
+
+    def __init__(self, path=DEFAULT_PATH, max_bytes=MAX_BYTES, enabled=None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.enabled = os.environ.get('PROJECTS_CACHE', '') != 'off' if enabled is None else enabled
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, name, func, args, kwargs, version=None):
+        h = hashlib.sha1()
+        h.update(repr((name, version, func.__defaults__)).encode())
+        _code_digest(func.__code__, h)
+        _digest(list(args), h)
+        _digest(kwargs, h)
+        return h.hexdigest()
+
+    def _entry(self, key):
+        return os.path.join(self.path, key)
+
+    def get(self, key):
+        """The stored output of ``key``, or ``MISSING`` if it is not cached."""
+        meta_file = os.path.join(self._entry(key), 'meta.json')
+        try:
+            with open(meta_file) as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            return MISSING
+        # the meta file's mtime is the entry's last use
+        os.utime(meta_file)
+        outputs = [_load(os.path.join(self._entry(key), name)) for name in meta['files']]
+        return tuple(outputs) if meta['tuple'] else outputs[0]
+
+    def put(self, key, name, result):
+        os.makedirs(self.path, exist_ok=True)
+        tmp = self._entry(key) + '.tmp-{}'.format(os.getpid())
+        os.makedirs(tmp, exist_ok=True)
+        outputs = result if isinstance(result, tuple) else (result,)
+        files = [_save(obj, os.path.join(tmp, str(i))) for i, obj in enumerate(outputs)]
+        with open(os.path.join(tmp, 'meta.json'), 'w') as f:
+            json.dump({'name': name, 'files': files, 'tuple': isinstance(result, tuple),
+                       'created': time.strftime('%Y-%m-%dT%H:%M:%S')}, f)
+        try:
+            os.rename(tmp, self._entry(key))
+        except OSError:
+            # another run stored the same key first
+            shutil.rmtree(tmp, ignore_errors=True)
+        self.evict(keep=key)
+
+    def entries(self):
+        """Frame of the stored entries, most recently used first."""
+        rows = []
+        if os.path.isdir(self.path):
+            for key in os.listdir(self.path):
+                meta_file = os.path.join(self._entry(key), 'meta.json')
+                if '.tmp-' in key or not os.path.exists(meta_file):
+                    continue
+                with open(meta_file) as f:
+                    meta = json.load(f)
+                rows.append({'key': key, 'name': meta['name'], 'bytes': _size(self._entry(key)),
+                             'created': meta['created'], 'used': os.path.getmtime(meta_file)})
+        table = pd.DataFrame(rows, columns=['key', 'name', 'bytes', 'created', 'used'])
+        table['used'] = pd.to_datetime(table['used'], unit='s')
+        return table.sort_values('used', ascending=False, ignore_index=True)
+
+    def evict(self, max_bytes=None, keep=None):
+        """Remove the least recently used entries until the cache fits in ``max_bytes``."""
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        table = self.entries()
+        total = table['bytes'].sum()
+        removed = []
+        for key, size in zip(table['key'][::-1], table['bytes'][::-1]):
+            if total <= max_bytes:
+                break
+            if key == keep:
+                continue
+            shutil.rmtree(self._entry(key), ignore_errors=True)
+            total -= size
+            removed.append(key)
+        return removed
+
+    def clear(self):
+        return self.evict(max_bytes=0)
+
+    def stage(self, name, version=None):
+        """Decorator: look the call up by its key, run and store it on a miss."""
+        def decorate(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                key = self.key(name, func, args, kwargs, version)
+                result = self.get(key)
+                if result is not MISSING:
+                    self.hits += 1
+                    return result
+                self.misses += 1
+                result = func(*args, **kwargs)
+                self.put(key, name, result)
+                return result
+            return wrapper
+        return decorate
+
+
+def main():
+    parser = argparse.ArgumentParser(description='List or trim the stage cache of the projects.')
+    parser.add_argument('--path', default=DEFAULT_PATH)
+    parser.add_argument('--clear', action='store_true', help='remove every entry')
+    parser.add_argument('--max-mb', type=float, help='evict least recently used entries down to this size')
+    args = parser.parse_args()
+
+    cache = StageCache(args.path)
+    if args.clear:
+        print('removed {} entries'.format(len(cache.clear())))
+    elif args.max_mb is not None:
+        print('removed {} entries'.format(len(cache.evict(int(args.max_mb * 2 ** 20)))))
+    table = cache.entries()
+    print(table.to_string(index=False) if len(table) else 'cache is empty')
+    print('{:,} bytes in {} entries'.format(table['bytes'].sum(), len(table)))
+
+
+if __name__ == '__main__':
+    main()
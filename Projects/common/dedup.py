@@ -0,0 +1,120 @@
+"""Hash-based de-duplication with a seen-set that persists across runs.
+
+``df.drop_duplicates()`` compares every column of every row and only knows
+about the frame in memory. For daily store scrapes we only want the rows that
+are new or changed since the previous runs, so each row (or a key subset such
+as ``['App', 'Last Updated']``) is reduced to a 64-bit fingerprint with
+``pd.util.hash_pandas_object`` and checked against a sorted ``uint64`` array
+kept on disk as ``.npy``.
+
+Command line usage, from the ``Projects`` directory::
+
+    python -m common.dedup scrape.csv --seen seen_apps.npy --key App "Last Updated" --out new_apps.csv
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+
+def row_fingerprints(df, subset=None):
+    """Return one ``uint64`` fingerprint per row of ``df`` (or of ``df[subset]``)."""
+    if subset is not None:
+        df = df[list(subset)]
+    return pd.util.hash_pandas_object(df, index=False).to_numpy(dtype=np.uint64)
+
+
+def drop_hashed_duplicates(df, subset=None):
+    """Drop repeated rows by fingerprint, keeping the first occurrence.
+
+    Matches ``df.drop_duplicates(subset)`` up to 64-bit hash collisions.
+    """
+    hashes = row_fingerprints(df, subset)
+    _, first = np.unique(hashes, return_index=True)
+    mask = np.zeros(len(df), dtype=bool)
+    mask[first] = True
+    return df[mask]
+
+
+class SeenSet:
+    """Sorted array of fingerprints stored as a ``.npy`` file.
+
+    The file is opened memory-mapped, so membership tests on a large history
+    only touch the pages ``np.searchsorted`` needs. ``add`` merges a batch of
+    new fingerprints and ``save`` writes the result back atomically.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        if os.path.exists(path):
+            self.hashes = np.load(path, mmap_mode='r')
+        else:
+            self.hashes = np.empty(0, dtype=np.uint64)
+
+    def __len__(self):
+        return len(self.hashes)
+
+    def contains(self, hashes):
+        """Return a boolean mask telling which of ``hashes`` were seen before."""
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        if len(self.hashes) == 0:
+            return np.zeros(len(hashes), dtype=bool)
+        pos = np.searchsorted(self.hashes, hashes)
+        pos[pos == len(self.hashes)] = 0
+        return self.hashes[pos] == hashes
+
+    def add(self, hashes):
+        self.hashes = np.union1d(self.hashes, np.asarray(hashes, dtype=np.uint64))
+
+    def save(self):
+        tmp = self.path + '.tmp.npy'
+        np.save(tmp, np.ascontiguousarray(self.hashes))
+        os.replace(tmp, self.path)
+
+
+def emit_unseen(df, seen, subset=None):
+    """Return the rows of ``df`` not in ``seen`` and record them as seen.
+
+    Repeated rows within ``df`` itself are emitted once. Returns the new rows
+    and a stats dict with row counts, elapsed seconds and rows/s.
+    """
+    start = time.perf_counter()
+    hashes = row_fingerprints(df, subset)
+    _, first = np.unique(hashes, return_index=True)
+    mask = np.zeros(len(df), dtype=bool)
+    mask[first] = True
+    mask &= ~seen.contains(hashes)
+    seen.add(hashes[mask])
+    elapsed = time.perf_counter() - start
+    stats = {
+        'rows_in': len(df),
+        'rows_out': int(mask.sum()),
+        'seen_total': len(seen),
+        'seconds': elapsed,
+        'rows_per_s': len(df) / elapsed if elapsed > 0 else float('inf'),
+    }
+    return df[mask], stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Emit only the rows of a CSV snapshot not seen in earlier runs.')
+    parser.add_argument('csv')
+    parser.add_argument('--seen', required=True, help='.npy file holding the sorted seen-set')
+    parser.add_argument('--key', nargs='+', help='columns to fingerprint (default: all)')
+    parser.add_argument('--out', help='where to write the unseen rows as CSV')
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.csv)
+    seen = SeenSet(args.seen)
+    new_rows, stats = emit_unseen(df, seen, args.key)
+    seen.save()
+    if args.out:
+        new_rows.to_csv(args.out, index=False)
+    print('{rows_in} rows in, {rows_out} new, {seen_total} seen in total '
+          '({seconds:.3f} s, {rows_per_s:,.0f} rows/s)'.format(**stats))
+
+
+if __name__ == '__main__':
+    main()
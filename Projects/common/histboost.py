@@ -0,0 +1,223 @@
+"""Gradient boosting on features quantized once into ``uint8`` bins.
+
+``GradientBoostingRegressor`` searches every split over the sorted raw
+feature values, and both boosting runs in ``Boostins_ada_gradient.py`` redo
+that work. Here every feature column is quantized once into at most 255
+bins (the midpoints between distinct values when there are few of them,
+quantiles of the present values otherwise), missing values get a bin of
+their own, ``MISSING_BIN``, and the ``uint8`` codes are cached on disk under
+a hash of the raw matrix. Trees are then grown on histograms: for a node, one
+``bincount`` over the node's codes gives the gradient sum and row count of
+every (feature, bin), and the cumulative sums score every split at once.
+``MISSING_BIN`` is the last bin, so missing values always go to the right.
+
+``HistGradientBoosting`` follows ``GradientBoosting*``'s parameters:
+``subsample`` draws rows without replacement for each tree,
+``max_features`` draws the candidate features at each split, and
+``loss='log_loss'`` fits a binary classifier with Newton-step leaf values.
+When no column needed quantile bins and nothing is sampled, the trees are
+``GradientBoostingRegressor``'s up to ties between equally good splits.
+
+    codes, edges = load_binned('liver_bins.npz', X)
+    gb = HistGradientBoosting(max_depth=4, n_estimators=200).fit(codes[train], y[train])
+"""
+import hashlib
+import os
+
+import numpy as np
+
+MAX_BINS = 255
+# code of NaN; the bins of present values are 0 .. MAX_BINS - 1
+MISSING_BIN = MAX_BINS
+
+
+def bin_edges(X, max_bins=MAX_BINS):
+    """Upper bin edges per column; a value ``x`` falls in the first bin with ``x <= edge``.
+
+    Only the present values count, NaN has its own bin (``MISSING_BIN``).
+    """
+    edges = []
+    for column in np.asarray(X, dtype=np.float64).T:
+        present = column[~np.isnan(column)]
+        distinct = np.unique(present)
+        if len(distinct) <= max_bins:
+            cuts = (distinct[:-1] + distinct[1:]) / 2
+        else:
+            cuts = np.unique(np.quantile(present, np.linspace(0, 1, max_bins + 1)[1:-1], method='midpoint'))
+        edges.append(cuts)
+    return edges
+
+
+def apply_bins(X, edges):
+    """``uint8`` bin codes of ``X`` for the given edges (NaN gets ``MISSING_BIN``)."""
+    X = np.asarray(X, dtype=np.float64)
+    codes = np.empty(X.shape, dtype=np.uint8)
+    for j, cuts in enumerate(edges):
+        codes[:, j] = np.where(np.isnan(X[:, j]), MISSING_BIN, np.searchsorted(cuts, X[:, j], side='left'))
+    return codes
+
+
+def load_binned(path, X, max_bins=MAX_BINS):
+    """Codes and edges of ``X``, read from ``path`` if it was cached for the same matrix."""
+    X = np.ascontiguousarray(X, dtype=np.float64)
+    key = hashlib.sha1(X.tobytes() + str((X.shape, max_bins, MISSING_BIN)).encode()).hexdigest()
+    if os.path.exists(path):
+        with np.load(path) as cached:
+            if str(cached['key']) == key:
+                n_edges = cached['n_edges']
+                edges = [row[:n] for row, n in zip(cached['edges'], n_edges)]
+                return cached['codes'], edges
+
+    edges = bin_edges(X, max_bins)
+    codes = apply_bins(X, edges)
+    padded = np.full((len(edges), max(max(len(e) for e in edges), 1)), np.inf)
+    for row, cuts in zip(padded, edges):
+        row[:len(cuts)] = cuts
+    tmp = path + '.tmp.npz'
+    np.savez(tmp, key=key, codes=codes, edges=padded, n_edges=[len(e) for e in edges])
+    os.replace(tmp, path)
+    return codes, edges
+
+
+class _Tree:
+    """Node arrays of one regression tree over bin codes; leaves point to themselves."""
+
+    def __init__(self):
+        self.feature, self.bin, self.left, self.right, self.value = [], [], [], [], []
+
+    def add(self):
+        for field in (self.feature, self.bin, self.value):
+            field.append(0)
+        node = len(self.left)
+        self.left.append(node)
+        self.right.append(node)
+        return node
+
+    def freeze(self, depth):
+        self.feature, self.bin, self.left, self.right = (
+            np.array(a, dtype=np.intp) for a in (self.feature, self.bin, self.left, self.right))
+        self.value = np.array(self.value, dtype=np.float64)
+        self.depth = depth
+
+    def apply(self, codes):
+        node = np.zeros(len(codes), dtype=np.intp)
+        rows = np.arange(len(codes))
+        for _ in range(self.depth):
+            go_left = codes[rows, self.feature[node]] <= self.bin[node]
+            node = np.where(go_left, self.left[node], self.right[node])
+        return node
+
+
+class HistGradientBoosting:
+    """Least-squares or binary log-loss gradient boosting over ``uint8`` bin codes."""
+
+    def __init__(self, loss='squared_error', n_estimators=100, learning_rate=0.1, max_depth=3,
+                 subsample=1.0, max_features=None, min_samples_leaf=1, random_state=None):
+        self.loss = loss
+        self.n_estimators = n_estimators
+        self.learning_rate = learning_rate
+        self.max_depth = max_depth
+        self.subsample = subsample
+        self.max_features = max_features
+        self.min_samples_leaf = min_samples_leaf
+        self.random_state = random_state
+
+    def _n_features_per_split(self, n_features):
+        if self.max_features is None:
+            return n_features
+        if isinstance(self.max_features, float):
+            return max(1, int(self.max_features * n_features))
+        return self.max_features
+
+    def _best_split(self, codes, grad, features):
+        """``(feature, bin)`` of the best least-squares split of a node, or ``None``."""
+        n, n_features = len(codes), len(features)
+        flat = (codes[:, features] + np.arange(n_features) * (MAX_BINS + 1)).ravel()
+        size = n_features * (MAX_BINS + 1)
+        sums = np.bincount(flat, np.repeat(grad, n_features), minlength=size).reshape(n_features, -1)
+        counts = np.bincount(flat, minlength=size).reshape(n_features, -1)
+        left_sum, left_n = np.cumsum(sums, axis=1), np.cumsum(counts, axis=1)
+        right_sum, right_n = grad.sum() - left_sum, n - left_n
+        with np.errstate(divide='ignore', invalid='ignore'):
+            gain = left_sum ** 2 / left_n + right_sum ** 2 / right_n - grad.sum() ** 2 / n
+        allowed = (left_n >= self.min_samples_leaf) & (right_n >= self.min_samples_leaf)
+        gain = np.where(allowed, gain, -np.inf)
+        best, bin_ = np.unravel_index(np.argmax(gain), gain.shape)
+        if gain[best, bin_] <= 1e-12:
+            return None
+        return features[best], bin_
+
+    def _leaf_value(self, grad, hess):
+        if self.loss == 'log_loss':
+            denominator = hess.sum()
+            return grad.sum() / denominator if denominator > 1e-150 else 0.0
+        return grad.mean()
+
+    def _grow(self, codes, grad, hess, rng):
+        tree = _Tree()
+        n_features = codes.shape[1]
+        k = self._n_features_per_split(n_features)
+        stack = [(tree.add(), np.arange(len(codes)), 0)]
+        depth = 0
+        while stack:
+            node, rows, level = stack.pop()
+            depth = max(depth, level)
+            split = None
+            if level < self.max_depth and len(rows) >= 2 * self.min_samples_leaf:
+                features = np.arange(n_features) if k == n_features else rng.choice(n_features, k, replace=False)
+                split = self._best_split(codes[rows], grad[rows], features)
+            if split is None:
+                tree.value[node] = self._leaf_value(grad[rows], hess[rows])
+                continue
+            feature, bin_ = split
+            go_left = codes[rows, feature] <= bin_
+            left, right = tree.add(), tree.add()
+            tree.feature[node], tree.bin[node] = feature, bin_
+            tree.left[node], tree.right[node] = left, right
+            stack.append((left, rows[go_left], level + 1))
+            stack.append((right, rows[~go_left], level + 1))
+        tree.freeze(depth)
+        return tree
+
+    def fit(self, codes, y):
+        codes = np.asarray(codes, dtype=np.uint8)
+        if self.loss == 'log_loss':
+            self.classes_, y = np.unique(np.asarray(y), return_inverse=True)
+        y = np.asarray(y, dtype=np.float64)
+        rng = np.random.default_rng(self.random_state)
+        if self.loss == 'log_loss':
+            p = np.clip(y.mean(), 1e-15, 1 - 1e-15)
+            self.init_ = np.log(p / (1 - p))
+        else:
+            self.init_ = y.mean()
+        raw = np.full(len(y), self.init_)
+        n_sample = max(1, int(self.subsample * len(y)))
+
+        self.trees_ = []
+        for _ in range(self.n_estimators):
+            if self.loss == 'log_loss':
+                prob = 1 / (1 + np.exp(-raw))
+                grad, hess = y - prob, prob * (1 - prob)
+            else:
+                grad, hess = y - raw, np.ones_like(y)
+            rows = np.arange(len(y)) if n_sample == len(y) else np.sort(rng.choice(len(y), n_sample, replace=False))
+            tree = self._grow(codes[rows], grad[rows], hess[rows], rng)
+            raw += self.learning_rate * tree.value[tree.apply(codes)]
+            self.trees_.append(tree)
+        return self
+
+    def decision_function(self, codes):
+        codes = np.asarray(codes, dtype=np.uint8)
+        raw = np.full(len(codes), self.init_)
+        for tree in self.trees_:
+            raw += self.learning_rate * tree.value[tree.apply(codes)]
+        return raw
+
+    def predict_proba(self, codes):
+        p = 1 / (1 + np.exp(-self.decision_function(codes)))
+        return np.column_stack([1 - p, p])
+
+    def predict(self, codes):
+        if self.loss == 'log_loss':
+            return self.classes_[(self.decision_function(codes) > 0).astype(np.intp)]
+        return self.decision_function(codes)
@@ -0,0 +1,70 @@
+"""Sweep ``k`` for a KNN classifier from one neighbour query.
+
+Choosing ``n_neighbors`` by refitting ``KNeighborsClassifier`` for every
+candidate re-queries the neighbour structure each time. The ``k`` nearest
+neighbours are a prefix of the ``K`` nearest ones, so one query for the
+largest ``K`` is enough: the sorted neighbour indices and distances are kept,
+and the votes for every ``k <= K`` are cumulative sums over that prefix.
+
+    sweep = KNNSweep().fit(X_train, y_train).query(X_test, k_max=50)
+    scores = sweep.scores(y_test)   # accuracy per k, uniform and distance weights
+"""
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import NearestNeighbors
+
+
+class KNNSweep:
+    """Cached neighbour graph of a test set, scored for every ``k``.
+
+    Predictions match ``KNeighborsClassifier(n_neighbors=k, weights=...)``
+    with the same ``algorithm``/``metric``; vote ties go to the smallest
+    class as in scikit-learn. Training points at exactly the same distance
+    can be ordered differently by queries with different ``k``, so with
+    duplicated distances a few predictions may differ.
+    """
+
+    def __init__(self, algorithm='auto', metric='minkowski', p=2, n_jobs=None):
+        self.nn = NearestNeighbors(algorithm=algorithm, metric=metric, p=p, n_jobs=n_jobs)
+
+    def fit(self, X_train, y_train):
+        self.nn.fit(X_train)
+        self.classes_, self.y_codes_ = np.unique(np.asarray(y_train), return_inverse=True)
+        return self
+
+    def query(self, X_test, k_max):
+        """Run the one batched neighbour query and cache its result."""
+        self.dist_, self.ind_ = self.nn.kneighbors(X_test, n_neighbors=k_max)
+        self.k_max = k_max
+        return self
+
+    def _weights(self, weights):
+        if weights == 'uniform':
+            return np.ones_like(self.dist_)
+        with np.errstate(divide='ignore'):
+            w = 1.0 / self.dist_
+        # like scikit-learn: exact matches get weight 1 and everything else 0
+        exact = self.dist_ == 0
+        has_exact = exact.any(axis=1)
+        w[has_exact] = exact[has_exact]
+        return w
+
+    def votes(self, weights='uniform'):
+        """Cumulative class votes, shape ``(n_classes, n_test, k_max)``."""
+        labels = self.y_codes_[self.ind_]
+        w = self._weights(weights)
+        return np.stack([np.cumsum((labels == c) * w, axis=1) for c in range(len(self.classes_))])
+
+    def predictions(self, weights='uniform'):
+        """Predicted labels for every ``k``, shape ``(n_test, k_max)``."""
+        return self.classes_[self.votes(weights).argmax(axis=0)]
+
+    def predict(self, k, weights='uniform'):
+        return self.predictions(weights)[:, k - 1]
+
+    def scores(self, y_test, weights=('uniform', 'distance')):
+        """Accuracy for every ``k`` in ``1..k_max`` and every weighting, as a frame."""
+        y_test = np.asarray(y_test)[:, None]
+        return pd.DataFrame(
+            {w: (self.predictions(w) == y_test).mean(axis=0) for w in weights},
+            index=pd.RangeIndex(1, self.k_max + 1, name='k'))
@@ -0,0 +1,70 @@
+"""Deferred imports, and a no-plot mode for headless runs.
+
+The scripts import seaborn, matplotlib, plotly and ``IPython.display`` at
+the top of a cell and pay for them (about a second for seaborn alone) even
+when they only run as a batch job for the numbers. ``lazy_import`` returns a
+stand-in that imports the module on its first attribute access, so a module
+is only loaded by the code that actually uses it::
+
+    plt = plotting('matplotlib.pyplot')
+    sns = plotting('seaborn')
+
+``plotting`` is ``lazy_import`` for plotting libraries. Once plots are off,
+with ``PROJECTS_NO_PLOT=1``, ``no_plot()`` or the runner's ``--no-plot``, it
+returns ``common.noplot.NULL`` instead, so the plotting calls do nothing and
+the library is never imported. pandas' ``.plot``/``.hist`` are routed to the
+same no-op backend. The numbers a cell computes are unchanged; checks that
+inspect a plot object do not pass without plots. To see what a run imports::
+
+    PROJECTS_NO_PLOT=1 python -X importtime pandas-Analyzing-Police-Activity.py 2> imports.log
+"""
+import importlib
+import os
+import sys
+
+from common import noplot
+
+_state = {'no_plot': False}
+
+
+class LazyModule:
+    """Imports module ``name`` on the first attribute access and forwards to it."""
+
+    def __init__(self, name):
+        self._lazy_name = name
+        self._lazy_module = None
+
+    def __getattr__(self, attr):
+        if self._lazy_module is None:
+            self._lazy_module = importlib.import_module(self._lazy_name)
+        return getattr(self._lazy_module, attr)
+
+    def __repr__(self):
+        state = 'loaded' if self._lazy_module is not None else 'not loaded'
+        return '<lazy module {!r} ({})>'.format(self._lazy_name, state)
+
+
+def lazy_import(name):
+    """Module ``name`` if it is already imported, otherwise a ``LazyModule``."""
+    module = sys.modules.get(name)
+    return module if module is not None else LazyModule(name)
+
+
+def plots_enabled():
+    return not _state['no_plot']
+
+
+def no_plot():
+    """Turn plotting off for the rest of the process."""
+    import pandas as pd
+    _state['no_plot'] = True
+    pd.set_option('plotting.backend', 'common.noplot')
+
+
+def plotting(name):
+    """Lazy plotting module ``name``, or ``NULL`` while plots are off."""
+    return noplot.NULL if _state['no_plot'] else lazy_import(name)
+
+
+if os.environ.get('PROJECTS_NO_PLOT', '') not in ('', '0'):
+    no_plot()
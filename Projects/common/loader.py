@@ -0,0 +1,124 @@
+"""Read the independent files of a project at the same time.
+
+Several notebooks read two or three csv files one after another (Scala's
+pulls and ``pull_files``, the Super Bowl tables, police stops and weather,
+Google Play apps and reviews). None depends on another, and pandas' C parser
+releases the GIL while it tokenizes, so ``read_all`` submits every file of a
+manifest to a pool and collects the frames::
+
+    frames = read_all({
+        'pulls_one': ('datasets/pulls_2011-2013.csv', {}),
+        'pull_files': ('datasets/pull_files.csv', {'usecols': ['pid', 'file']}),
+    })
+
+A manifest maps a name to a path and the ``read_csv`` keyword arguments for
+that file. ``executor='thread'`` shares the process and needs no copies;
+``'process'`` sidesteps the GIL entirely but pickles every frame back to the
+parent, which only pays off for large files with little text.
+``PROJECT_FILES`` lists the files each project reads, and from ``Projects``
+the sequential and pooled reads of the synthetic replicas are compared::
+
+    python -m common.loader --scale 10
+    python -m common.loader scala police --scale 100 --executor thread process
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pandas as pd
+
+from common import synth
+
+EXECUTORS = {'thread': ThreadPoolExecutor, 'process': ProcessPoolExecutor}
+
+# project -> synth.DATASETS names it reads
+PROJECT_FILES = {
+    'scala': ['pulls_2011-2013', 'pulls_2014-2018', 'pull_files'],
+    'super_bowl': ['super_bowls', 'tv', 'halftime_musicians'],
+    'police': ['police', 'weather'],
+    'google_play': ['apps', 'user_reviews'],
+}
+
+
+def _read(path, read_kwargs):
+    return pd.read_csv(path, **read_kwargs)
+
+
+def read_sequential(manifest):
+    """``{name: frame}`` read one file after another."""
+    return {name: _read(path, read_kwargs) for name, (path, read_kwargs) in manifest.items()}
+
+
+def read_all(manifest, executor='thread', max_workers=None):
+    """``{name: frame}`` for every ``name: (path, read_kwargs)`` of the manifest, read concurrently.
+
+    Uses one worker per file up to the number of CPUs and reads sequentially
+    when that leaves a single worker. The first error raised by a read is
+    raised here once all reads are done.
+    """
+    max_workers = max_workers or min(len(manifest), os.cpu_count() or 1)
+    if max_workers < 2:
+        return read_sequential(manifest)
+    with EXECUTORS[executor](max_workers=max_workers) as pool:
+        futures = {name: pool.submit(_read, path, read_kwargs) for name, (path, read_kwargs) in manifest.items()}
+    return {name: future.result() for name, future in futures.items()}
+
+
+def project_manifest(project, scale=None):
+    """Manifest of a project's files (their ``scale`` replicas if given) that exist in the tree."""
+    manifest = {}
+    for name in PROJECT_FILES[project]:
+        _, read_kwargs, _ = synth.DATASETS[name]
+        try:
+            path = synth.dataset_path(name) if scale is None else synth.ensure_replica(name, scale)
+        except FileNotFoundError:
+            continue
+        if os.path.exists(path):
+            manifest[name] = (path, read_kwargs)
+    return manifest
+
+
+def _best_time(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare sequential and concurrent reads of the project files.')
+    parser.add_argument('projects', nargs='*', help='{} (default: all)'.format(', '.join(PROJECT_FILES)))
+    parser.add_argument('--scale', type=int, help='read the synthetic replicas of this scale')
+    parser.add_argument('--executor', nargs='+', default=['thread'], help='thread and/or process')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    unknown = set(args.projects) - set(PROJECT_FILES)
+    if unknown:
+        parser.error('unknown projects: {}'.format(', '.join(sorted(unknown))))
+    unknown = set(args.executor) - set(EXECUTORS)
+    if unknown:
+        parser.error('unknown executors: {}'.format(', '.join(sorted(unknown))))
+
+    print('{} CPUs'.format(os.cpu_count()))
+    for project in args.projects or list(PROJECT_FILES):
+        manifest = project_manifest(project, args.scale)
+        missing = sorted(set(PROJECT_FILES[project]) - set(manifest))
+        if len(manifest) < 2:
+            print('{}: fewer than two files in the tree, skipped'.format(project))
+            continue
+        size = sum(os.path.getsize(path) for path, _ in manifest.values())
+        sequential = _best_time(lambda: read_sequential(manifest), args.repeat)
+        line = '{}: {} files, {:.1f} MB, sequential {:.3f} s'.format(project, len(manifest), size / 2 ** 20, sequential)
+        for executor in args.executor:
+            pooled = _best_time(lambda: read_all(manifest, executor, max_workers=len(manifest)), args.repeat)
+            line += ', {} {:.3f} s ({:.2f}x)'.format(executor, pooled, sequential / pooled)
+        if missing:
+            line += ' [not in the tree: {}]'.format(', '.join(missing))
+        print(line)
+
+
+if __name__ == '__main__':
+    main()
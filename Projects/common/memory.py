@@ -0,0 +1,132 @@
+"""Report where a frame's memory goes and downcast its columns safely.
+
+Every project reads its csv with pandas' defaults, so strings are objects
+and numbers are 64 bits wide however few distinct values or digits they
+have. ``memory_report`` lists the deep ``memory_usage`` of every column next
+to the dtype ``propose_dtype`` would give it and what that would take:
+
+* strings with few distinct values (``Category``, ``sex``, ``violation``)
+  become ``category``,
+* integers get the smallest signed width that holds their min and max,
+* floats become ``float32`` only if every value survives the round trip,
+* object columns holding only ``True``/``False`` become ``bool`` (0/1
+  integer columns too, with ``int_flags=True``).
+
+A narrower integer still overflows if the analysis multiplies it, and a
+categorical column rejects new values or changes what ``.str`` and ``.map``
+return, so the notebooks apply ``downcast(frame, dtypes={...})`` with the
+columns picked from the report right after loading. ``PROJECTS_DOWNCAST=off``
+makes ``downcast`` return the frame unchanged, so running a notebook both
+ways shows whether its results depend on the dtypes; from ``Projects``::
+
+    python -m common.memory            # report of every dataset in the tree
+    python -m common.memory apps police --columns
+    PROJECTS_DOWNCAST=off python -m common.runner <notebook> --nose run --show-output > before.txt
+    python -m common.runner <notebook> --nose run --show-output > after.txt
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from common import synth
+
+MAX_CATEGORY_RATIO = 0.5
+
+
+def _is_text(col):
+    return col.dtype == object or pd.api.types.is_string_dtype(col.dtype)
+
+
+def propose_dtype(col, max_category_ratio=MAX_CATEGORY_RATIO, int_flags=False):
+    """Narrower dtype that holds the same values, or ``None`` to keep the column."""
+    values = col.dropna()
+    if len(values) == 0 or isinstance(col.dtype, pd.CategoricalDtype):
+        return None
+    if col.dtype == object and not col.isna().any() and values.map(type).eq(bool).all():
+        return 'bool'
+    if _is_text(col):
+        if values.nunique() <= max_category_ratio * len(values):
+            return 'category'
+        return None
+    if pd.api.types.is_bool_dtype(col.dtype):
+        return None
+    if pd.api.types.is_integer_dtype(col.dtype):
+        if int_flags and values.isin([0, 1]).all():
+            return 'bool'
+        for dtype in (np.int8, np.int16, np.int32):
+            info = np.iinfo(dtype)
+            if info.min <= values.min() and values.max() <= info.max:
+                return None if np.dtype(dtype) == col.dtype else np.dtype(dtype).name
+        return None
+    if col.dtype == np.float64:
+        if np.array_equal(values.to_numpy(), values.to_numpy().astype(np.float32).astype(np.float64)):
+            return 'float32'
+    return None
+
+
+def propose_dtypes(df, **kwargs):
+    """``{column: dtype}`` for every column ``propose_dtype`` would change.
+
+    Pass ``df.drop(columns=...)`` to leave columns whose dtype an analysis
+    depends on alone.
+    """
+    proposed = {}
+    for name, col in df.items():
+        dtype = propose_dtype(col, **kwargs)
+        if dtype is not None:
+            proposed[name] = dtype
+    return proposed
+
+
+def downcast(df, dtypes=None, **kwargs):
+    """Copy of ``df`` with the proposed (or given) dtypes applied (``df`` itself with ``PROJECTS_DOWNCAST=off``)."""
+    if os.environ.get('PROJECTS_DOWNCAST', '') == 'off':
+        return df
+    return df.astype(propose_dtypes(df, **kwargs) if dtypes is None else dtypes)
+
+
+def memory_report(df, dtypes=None, **kwargs):
+    """Deep bytes per column, now and after the downcast, with a ``total`` row."""
+    dtypes = propose_dtypes(df, **kwargs) if dtypes is None else dtypes
+    after = df.astype(dtypes)
+    report = pd.DataFrame({
+        'dtype': df.dtypes.astype(str),
+        'bytes': df.memory_usage(deep=True, index=False),
+        'proposed': after.dtypes.astype(str).where(df.columns.isin(list(dtypes)), ''),
+        'proposed_bytes': after.memory_usage(deep=True, index=False),
+    })
+    report.loc['total'] = ['', report['bytes'].sum(), '', report['proposed_bytes'].sum()]
+    report['saved'] = 1 - report['proposed_bytes'] / report['bytes']
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Memory report of the project datasets.')
+    parser.add_argument('names', nargs='*', help='datasets to report: {} (default: all)'.format(', '.join(synth.DATASETS)))
+    parser.add_argument('--int-flags', action='store_true', help='turn 0/1 integer columns into bool too')
+    parser.add_argument('--columns', action='store_true', help='print the per-column report')
+    args = parser.parse_args()
+    unknown = set(args.names) - set(synth.DATASETS)
+    if unknown:
+        parser.error('unknown datasets: {}'.format(', '.join(sorted(unknown))))
+
+    for name in args.names or list(synth.DATASETS):
+        try:
+            frame = synth.load_dataset(name)
+        except FileNotFoundError:
+            print('{}: not in the tree, skipped'.format(name))
+            continue
+        dtypes = propose_dtypes(frame, int_flags=args.int_flags)
+        report = memory_report(frame, dtypes)
+        total = report.loc['total']
+        print('{}: {:,} -> {:,} bytes ({:.0%} saved), {} columns changed: {}'.format(
+            name, total['bytes'], total['proposed_bytes'], total['saved'], len(dtypes),
+            ', '.join('{} {}'.format(col, dtype) for col, dtype in dtypes.items())))
+        if args.columns:
+            print(report.to_string())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""Do-nothing plotting, for runs that only compute the numbers.
+
+``NULL`` stands in for a plotting module, figure or axes: any attribute,
+call or index returns ``NULL`` again, and unpacking it gives two of them
+(``fig, ax = plt.subplots()``). The module itself is a pandas plotting
+backend, so with ``pd.set_option('plotting.backend', 'common.noplot')``
+``df.plot(...)`` and ``df.hist()`` return ``NULL`` without importing
+matplotlib. ``common.lazy.no_plot()`` switches both on.
+"""
+
+
+class _Null:
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return self
+
+    def __call__(self, *args, **kwargs):
+        return self
+
+    def __getitem__(self, key):
+        return self
+
+    def __setitem__(self, key, value):
+        pass
+
+    def __iter__(self):
+        return iter((self, self))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __repr__(self):
+        return '<no plot>'
+
+
+NULL = _Null()
+
+
+# the entry points pandas looks up on a plotting backend
+def plot(data, kind=None, **kwargs):
+    return NULL
+
+
+def hist_series(data, **kwargs):
+    return NULL
+
+
+def hist_frame(data, **kwargs):
+    return NULL
+
+
+def boxplot(data, **kwargs):
+    return NULL
+
+
+def boxplot_frame(data, **kwargs):
+    return NULL
+
+
+def boxplot_frame_groupby(data, **kwargs):
+    return NULL
@@ -0,0 +1,280 @@
+"""Server-side aggregation of plotting data.
+
+The notebooks hand full columns to seaborn/plotly (hex jointplots, strip
+plots, box plots, ``lmplot``). That is fine for a few thousand rows, but with
+millions of rows the rendering time and the size of the notebook output blow
+up. The helpers below reduce the data before it reaches the plotting library:
+
+* ``hexbin_counts`` bins points into hexagons and returns one row per
+  non-empty cell,
+* ``box_stats`` computes quartiles and whiskers per group,
+* ``sample_per_group`` / ``reservoir_sample`` keep a bounded random sample of
+  points for strip plots and scatter overlays,
+* ``fit_line`` fits a regression on all rows so only the line and its
+  confidence band have to be drawn.
+
+The ``*_plot``/``box_trace`` wrappers fall back to the original full-data
+call when the input is at most ``max_points`` rows, so small datasets look
+exactly as before. Every wrapped plot is logged in ``payload_log`` by name
+(re-running a cell replaces its entry), the full-data ones with nothing
+saved, and ``payload_report()`` at the end of a notebook prints how much
+smaller the plotted data became.
+"""
+import math
+
+import numpy as np
+import pandas as pd
+
+from common.lazy import plotting
+
+MAX_POINTS = 50000
+
+payload_log = {}
+
+
+def payload_bytes(obj):
+    """Approximate in-memory size of data passed to a plotting call."""
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(index=False, deep=True).sum())
+    if isinstance(obj, pd.Series):
+        return int(obj.memory_usage(index=False, deep=True))
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if isinstance(obj, dict):
+        return sum(payload_bytes(v) for v in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return sum(payload_bytes(v) for v in obj)
+    return 8
+
+
+def log_payload(name, full, sent):
+    full_bytes, sent_bytes = payload_bytes(full), payload_bytes(sent)
+    payload_log[name] = (full_bytes, sent_bytes)
+    return full_bytes, sent_bytes
+
+
+def payload_report():
+    """Print the size of the full and the plotted data for every logged plot."""
+    if not payload_log:
+        print('no plots went through common.plotprep')
+        return
+    print('{:<30s} {:>12s} {:>12s} {:>8s}'.format('plot', 'full (B)', 'sent (B)', 'shrink'))
+    for name, (full_bytes, sent_bytes) in payload_log.items():
+        ratio = full_bytes / sent_bytes if sent_bytes else float('inf')
+        print('{:<30s} {:>12,d} {:>12,d} {:>7.1f}x'.format(name, full_bytes, sent_bytes, ratio))
+
+
+def _finite(x, y):
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    keep = np.isfinite(x) & np.isfinite(y)
+    return x[keep], y[keep]
+
+
+def hexbin_counts(x, y, gridsize=50, extent=None):
+    """Bin points into the same hexagonal grid ``plt.hexbin`` uses.
+
+    Returns a frame with the centre (``x``, ``y``) and ``count`` of every
+    non-empty hexagon, plus the ``extent`` that has to be passed back to
+    ``hexbin`` for the cells to line up.
+    """
+    x, y = _finite(x, y)
+    if extent is None:
+        extent = (x.min(), x.max(), y.min(), y.max())
+    xmin, xmax, ymin, ymax = extent
+    nx = gridsize
+    ny = int(nx / math.sqrt(3))
+    sx = (xmax - xmin) / nx or 1.0
+    sy = (ymax - ymin) / ny or 1.0
+
+    ix = (x - xmin) / sx
+    iy = (y - ymin) / sy
+    ix1, iy1 = np.round(ix).astype(np.int64), np.round(iy).astype(np.int64)
+    ix2, iy2 = np.floor(ix).astype(np.int64), np.floor(iy).astype(np.int64)
+    d1 = (ix - ix1) ** 2 + 3.0 * (iy - iy1) ** 2
+    d2 = (ix - ix2 - 0.5) ** 2 + 3.0 * (iy - iy2 - 0.5) ** 2
+    first = d1 < d2
+
+    # one integer code per (lattice, column, row) cell
+    lattice = np.where(first, 0, 1)
+    col = np.where(first, ix1, ix2)
+    row = np.where(first, iy1, iy2)
+    codes = (lattice * (nx + 2) + col) * (ny + 2) + row
+    cells, counts = np.unique(codes, return_counts=True)
+
+    row = cells % (ny + 2)
+    col = (cells // (ny + 2)) % (nx + 2)
+    offset = 0.5 * (cells // ((ny + 2) * (nx + 2)))
+    centres = pd.DataFrame({
+        'x': (col + offset) * sx + xmin,
+        'y': (row + offset) * sy + ymin,
+        'count': counts,
+    })
+    return centres, extent
+
+
+def histogram_counts(values, bins=50):
+    """Return ``(counts, edges)`` of a 1-d histogram, ignoring NaN."""
+    values = np.asarray(values, dtype=float)
+    return np.histogram(values[np.isfinite(values)], bins=bins)
+
+
+def box_stats(values, whis=1.5):
+    """Quartiles and Tukey whiskers of ``values`` (NaN ignored; all NaN for no values)."""
+    values = np.asarray(values, dtype=float)
+    values = np.sort(values[np.isfinite(values)])
+    if len(values) == 0:
+        stats = dict.fromkeys(['q1', 'median', 'q3', 'lowerfence', 'upperfence', 'mean'], np.nan)
+        stats.update(n=0, n_outliers=0)
+        return stats
+    q1, median, q3 = np.percentile(values, [25, 50, 75])
+    iqr = q3 - q1
+    inside = values[(values >= q1 - whis * iqr) & (values <= q3 + whis * iqr)]
+    return {
+        'q1': q1, 'median': median, 'q3': q3,
+        'lowerfence': inside[0], 'upperfence': inside[-1],
+        'mean': values.mean(), 'n': len(values),
+        'n_outliers': len(values) - len(inside),
+    }
+
+
+def grouped_box_stats(df, value, by):
+    """``box_stats`` of ``df[value]`` for every group of ``df[by]``, as a frame."""
+    rows = {name: box_stats(group) for name, group in df.groupby(by, observed=True)[value]}
+    return pd.DataFrame.from_dict(rows, orient='index')
+
+
+def sample_per_group(df, by, k, seed=0):
+    """Keep at most ``k`` random rows from every group of ``df[by]``.
+
+    Groups with ``k`` rows or fewer are kept whole, so the result equals ``df``
+    when no group is larger than ``k``. Row order is preserved.
+    """
+    codes, _ = pd.factorize(df[by])
+    keys = np.random.default_rng(seed).random(len(df))
+    order = np.lexsort((keys, codes))
+    sorted_codes = codes[order]
+    starts = np.r_[0, np.flatnonzero(np.diff(sorted_codes)) + 1]
+    group_start = np.repeat(starts, np.diff(np.r_[starts, len(order)]))
+    rank = np.empty(len(df), dtype=np.int64)
+    rank[order] = np.arange(len(order)) - group_start
+    return df[(rank < k) & (codes >= 0)]
+
+
+def reservoir_sample(chunks, k, seed=0):
+    """Uniform sample of ``k`` rows from an iterable of frames.
+
+    Every row gets a random key and the ``k`` smallest keys are kept, which
+    is a reservoir sample that only ever holds ``k`` + one chunk of rows.
+    """
+    rng = np.random.default_rng(seed)
+    reservoir = None
+    for chunk in chunks:
+        chunk = chunk.assign(_key=rng.random(len(chunk)))
+        if reservoir is not None:
+            chunk = pd.concat([reservoir, chunk])
+        reservoir = chunk.nsmallest(k, '_key')
+    if reservoir is None:
+        return None
+    return reservoir.drop(columns='_key').sort_index()
+
+
+def fit_line(x, y, n_points=100, z=1.96):
+    """Least-squares line fitted on all points, evaluated on a grid.
+
+    Returns a frame with ``x``, the fitted ``y`` and the ``lo``/``hi`` bounds
+    of the confidence band of the mean (normal approximation).
+    """
+    x, y = _finite(x, y)
+    n = len(x)
+    xbar, ybar = x.mean(), y.mean()
+    sxx = ((x - xbar) ** 2).sum()
+    slope = ((x - xbar) * (y - ybar)).sum() / sxx
+    intercept = ybar - slope * xbar
+    resid = y - (intercept + slope * x)
+    s = math.sqrt((resid ** 2).sum() / max(n - 2, 1))
+
+    grid = np.linspace(x.min(), x.max(), n_points)
+    fitted = intercept + slope * grid
+    se = s * np.sqrt(1.0 / n + (grid - xbar) ** 2 / sxx)
+    return pd.DataFrame({'x': grid, 'y': fitted, 'lo': fitted - z * se, 'hi': fitted + z * se})
+
+
+def hexbin_jointplot(x, y, gridsize=50, max_points=MAX_POINTS):
+    """``sns.jointplot(kind='hex')`` drawn from pre-binned counts on large inputs."""
+    sns = plotting('seaborn')
+
+    name = 'hexbin ' + str(getattr(y, 'name', 'y'))
+    if len(x) <= max_points:
+        log_payload(name, [x, y], [x, y])
+        return sns.jointplot(x=x, y=y, kind='hex')
+
+    cells, extent = hexbin_counts(x, y, gridsize=gridsize)
+    x_counts, x_edges = histogram_counts(x)
+    y_counts, y_edges = histogram_counts(y)
+    log_payload(name, [x, y], [cells, x_counts, x_edges, y_counts, y_edges])
+
+    grid = sns.JointGrid()
+    grid.ax_joint.hexbin(cells['x'], cells['y'], C=cells['count'], reduce_C_function=np.sum,
+                         gridsize=gridsize, extent=extent, mincnt=1, cmap='Blues')
+    grid.ax_marg_x.stairs(x_counts, x_edges, fill=True)
+    grid.ax_marg_y.stairs(y_counts, y_edges, fill=True, orientation='horizontal')
+    grid.set_axis_labels(getattr(x, 'name', ''), getattr(y, 'name', ''))
+    return grid
+
+
+def stripplot(x, y, data, k=500, max_points=MAX_POINTS, seed=0, **kwargs):
+    """``sns.stripplot`` on at most ``k`` sampled points per ``y`` category for large inputs."""
+    sns = plotting('seaborn')
+
+    if len(data) > max_points:
+        sample = sample_per_group(data, y, k, seed=seed)
+        log_payload('strip ' + x, data[[x, y]], sample[[x, y]])
+        data = sample
+    else:
+        log_payload('strip ' + x, data[[x, y]], data[[x, y]])
+    return sns.stripplot(x=x, y=y, data=data, **kwargs)
+
+
+def box_trace(values, name, max_points=MAX_POINTS):
+    """``go.Box`` with precomputed quartiles instead of raw values for large inputs."""
+    go = plotting('plotly.graph_objs')
+
+    if len(values) <= max_points:
+        log_payload('box ' + name, values, values)
+        return go.Box(y=values, name=name)
+    stats = box_stats(values)
+    log_payload('box ' + name, values, np.array(list(stats.values())))
+    return go.Box(q1=[stats['q1']], median=[stats['median']], q3=[stats['q3']],
+                  lowerfence=[stats['lowerfence']], upperfence=[stats['upperfence']],
+                  mean=[stats['mean']], x=[name], name=name)
+
+
+def lmplot(x, y, data, row=None, sample_size=2000, max_points=MAX_POINTS, seed=0):
+    """``sns.lmplot`` whose line is fitted on all rows but only a sample is scattered."""
+    plt = plotting('matplotlib.pyplot')
+    sns = plotting('seaborn')
+
+    if len(data) <= max_points:
+        columns = [c for c in (x, y, row) if c is not None]
+        log_payload('lmplot ' + y, data[columns], data[columns])
+        return sns.lmplot(x=x, y=y, data=data, row=row)
+
+    data = data[[c for c in (x, y, row) if c is not None]].dropna()
+    groups = list(data.groupby(row, observed=True)) if row else [(None, data)]
+    fig, axes = plt.subplots(len(groups), 1, sharex=True, squeeze=False,
+                             figsize=(5, 5 * len(groups)))
+    sent = []
+    for ax, (name, group) in zip(axes[:, 0], groups):
+        line = fit_line(group[x], group[y])
+        points = group.sample(min(sample_size, len(group)), random_state=seed)
+        sent += [line, points[[x, y]]]
+        ax.scatter(points[x], points[y], s=10, alpha=0.5)
+        ax.plot(line['x'], line['y'])
+        ax.fill_between(line['x'], line['lo'], line['hi'], alpha=0.2)
+        ax.set_ylabel(y)
+        if name is not None:
+            ax.set_title('{} = {}'.format(row, name))
+    axes[-1, 0].set_xlabel(x)
+    log_payload('lmplot ' + y, data, sent)
+    return fig
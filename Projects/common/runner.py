@@ -0,0 +1,289 @@
+"""Headless runner for the project notebooks with per-cell timing.
+
+The notebooks (and their ``notebook.py`` exports) call
+``get_ipython().run_cell_magic('nose', ...)``,
+``run_line_magic('matplotlib', 'inline')`` and ``display``, so they only run
+inside IPython. This runner executes the code cells of one or more notebooks
+in a single process with those hooks stubbed out:
+
+* ``%matplotlib`` switches matplotlib to the ``Agg`` backend,
+* ``%%nose`` cells are skipped (``--nose skip``), run right away
+  (``--nose run``) or collected and run after the last cell
+  (``--nose batch``; checks then see the final state of the namespace),
+* ``display(obj)`` and a trailing expression are kept in ``_`` and the
+  cell sources in ``In`` like IPython does, so checks that read ``_`` or
+  ``In[-2]`` still work.
+
+Each cell is timed (wall and CPU), and ``peak_rss_delta`` records how far
+it raised the process peak RSS (0 when an earlier cell had already reached
+that much). ``tracemalloc`` slows allocation-heavy cells down several
+times, so the peak of Python-tracked allocations (numpy included) is only
+recorded with ``--memory``; such runs are marked ``"traced": true`` in the
+report and their timings should not be compared with untraced ones. Cell
+output is swallowed unless ``--show-output`` is given. The report is written as JSON::
+
+    python -m common.runner --all --report cell_timings.json
+    python -m common.runner "The GitHub History of the Scala Language/notebook.py" --nose run
+    python -m common.runner --all --memory --report cell_memory.json
+
+``--trace trace.json`` also writes a Chrome trace (``common.trace``) with
+every cell as a stage and the named stages of the scripts nested inside it.
+``--no-plot`` runs with plotting turned off (``common.lazy``), so only the
+numbers are computed and the plotting libraries are not imported.
+
+Plain scripts without ``# In[..]:`` markers are split into cells on the
+``#####...`` separator lines used in ``ensemble.py`` and friends.
+"""
+import argparse
+import ast
+import contextlib
+import glob
+import io
+import json
+import os
+import platform
+import re
+import sys
+import time
+import tracemalloc
+import traceback
+
+from common import lazy, trace
+
+PROJECTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CELL_MARKER = re.compile(r'^# In\[\s*\d*\]:\s*$', re.M)
+SEPARATOR = re.compile(r'^#{20,}\s*$', re.M)
+
+
+def load_cells(path):
+    """Return the code cells of a notebook or script as a list of source strings."""
+    if path.endswith('.ipynb'):
+        with open(path, encoding='utf-8') as f:
+            nb = json.load(f)
+        cells = []
+        for cell in nb['cells']:
+            if cell['cell_type'] == 'code':
+                src = cell['source']
+                cells.append(''.join(src) if isinstance(src, list) else src)
+        return [translate_magics(c) for c in cells]
+    with open(path, encoding='utf-8') as f:
+        text = f.read()
+    marker = CELL_MARKER if CELL_MARKER.search(text) else SEPARATOR
+    return [c for c in marker.split(text) if c.strip()]
+
+
+def translate_magics(src):
+    """Rewrite ``%%cell`` and ``%line`` magics into ``get_ipython()`` calls."""
+    if src.startswith('%%'):
+        first, _, body = src.partition('\n')
+        name, _, line = first[2:].partition(' ')
+        return 'get_ipython().run_cell_magic({!r}, {!r}, {!r})'.format(name, line, body)
+    lines = []
+    for line in src.split('\n'):
+        stripped = line.lstrip()
+        if stripped.startswith('%'):
+            name, _, arg = stripped[1:].partition(' ')
+            indent = line[:len(line) - len(stripped)]
+            line = '{}get_ipython().run_line_magic({!r}, {!r})'.format(indent, name, arg)
+        lines.append(line)
+    return '\n'.join(lines)
+
+
+def discover():
+    """All ``.ipynb`` notebooks in the project folders."""
+    return sorted(glob.glob(os.path.join(PROJECTS_DIR, '*', '*.ipynb')))
+
+
+class NoseCheck:
+    def __init__(self, cell, body):
+        self.cell = cell
+        self.body = body
+
+
+class Shell:
+    """The subset of ``get_ipython()`` the notebooks use."""
+
+    def __init__(self, runner):
+        self.runner = runner
+
+    def run_line_magic(self, name, line):
+        if name == 'matplotlib' and lazy.plots_enabled():
+            import matplotlib
+            matplotlib.use('Agg')
+
+    def run_cell_magic(self, name, line, body):
+        if name == 'nose':
+            self.runner.nose_cell(body)
+
+
+class NotebookRun:
+    """Execute the cells of one notebook in a fresh namespace."""
+
+    def __init__(self, path, nose='skip', memory=False, show_output=False):
+        self.path = os.path.abspath(path)
+        self.nose = nose
+        self.memory = memory
+        self.show_output = show_output
+        self.cell_index = None
+        self.pending = []
+        self.checks = []
+        self.namespace = {
+            '__name__': '__main__',
+            '__file__': self.path,
+            'get_ipython': lambda: self.shell,
+            'display': self.display,
+            'In': [''],
+        }
+        self.shell = Shell(self)
+
+    def display(self, *objs, **kwargs):
+        if objs:
+            self.namespace['_'] = objs[-1]
+
+    def nose_cell(self, body):
+        if self.nose == 'run':
+            self.checks.extend(self.run_checks(self.cell_index, body))
+        elif self.nose == 'batch':
+            self.pending.append(NoseCheck(self.cell_index, body))
+
+    def run_checks(self, cell, body):
+        ns = dict(self.namespace)
+        results = []
+        try:
+            exec(compile(body, '<nose cell {}>'.format(cell), 'exec'), ns)
+        except Exception as e:
+            return [{'cell': cell, 'test': None, 'passed': False, 'error': repr(e)}]
+        tests = [name for name, obj in ns.items()
+                 if name.startswith('test_') and callable(obj) and name not in self.namespace]
+        for name in tests:
+            try:
+                ns[name]()
+                results.append({'cell': cell, 'test': name, 'passed': True, 'error': None})
+            except Exception as e:
+                results.append({'cell': cell, 'test': name, 'passed': False, 'error': repr(e)})
+        return results
+
+    def exec_cell(self, src):
+        tree = ast.parse(src, filename='<cell {}>'.format(self.cell_index))
+        last = None
+        if tree.body and isinstance(tree.body[-1], ast.Expr):
+            last = ast.Expression(tree.body.pop().value)
+        exec(compile(tree, '<cell {}>'.format(self.cell_index), 'exec'), self.namespace)
+        if last is not None:
+            value = eval(compile(last, '<cell {}>'.format(self.cell_index), 'eval'), self.namespace)
+            if value is not None:
+                self.namespace['_'] = value
+
+    def run(self, stop_on_error=False):
+        cells = load_cells(self.path)
+        records = []
+        old_cwd, old_path = os.getcwd(), list(sys.path)
+        os.chdir(os.path.dirname(self.path))
+        sys.path.insert(0, os.path.dirname(self.path))
+        os.environ.setdefault('MPLBACKEND', 'Agg')
+        start = time.perf_counter()
+        try:
+            for i, src in enumerate(cells):
+                self.cell_index = i
+                record = self.run_cell(i, src)
+                records.append(record)
+                if record['status'] == 'error' and stop_on_error:
+                    break
+            for check in self.pending:
+                self.checks.extend(self.run_checks(check.cell, check.body))
+        finally:
+            os.chdir(old_cwd)
+            sys.path[:] = old_path
+        return {
+            'notebook': os.path.relpath(self.path, PROJECTS_DIR),
+            'wall_s': time.perf_counter() - start,
+            'traced': self.memory,
+            'cells': records,
+            'nose': {
+                'mode': self.nose,
+                'passed': sum(c['passed'] for c in self.checks),
+                'failed': sum(not c['passed'] for c in self.checks),
+                'checks': self.checks,
+            },
+        }
+
+    def run_cell(self, i, src):
+        self.namespace['In'].append(src)
+        kind = 'nose' if "run_cell_magic('nose'" in src else 'code'
+        record = {'cell': i, 'kind': kind, 'source': src.strip().split('\n')[0][:80],
+                  'status': 'ok', 'error': None}
+        if kind == 'nose' and self.nose == 'skip':
+            record.update(status='skipped', wall_s=0.0, cpu_s=0.0)
+            return record
+        if self.memory:
+            tracemalloc.start()
+            tracemalloc.reset_peak()
+        rss = trace.peak_rss()
+        out = contextlib.nullcontext() if self.show_output else contextlib.redirect_stdout(io.StringIO())
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            with out, trace.stage('{} [{}]'.format(os.path.basename(os.path.dirname(self.path)), i)):
+                self.exec_cell(src)
+        except Exception:
+            record['status'] = 'error'
+            record['error'] = traceback.format_exc(limit=-3)
+        record['wall_s'] = time.perf_counter() - wall
+        record['cpu_s'] = time.process_time() - cpu
+        record['peak_rss_delta'] = None if rss is None else trace.peak_rss() - rss
+        if self.memory:
+            record['peak_alloc_bytes'] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        return record
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run project notebooks headless and time every cell.')
+    parser.add_argument('paths', nargs='*', help='.ipynb or exported .py files')
+    parser.add_argument('--all', action='store_true', help='run every project notebook')
+    parser.add_argument('--nose', choices=['skip', 'run', 'batch'], default='skip')
+    parser.add_argument('--memory', action='store_true',
+                        help='record peak_alloc_bytes with tracemalloc (slows the cells down)')
+    parser.add_argument('--stop-on-error', action='store_true')
+    parser.add_argument('--show-output', action='store_true', help='let cells print to stdout')
+    parser.add_argument('--report', default='cell_timings.json')
+    parser.add_argument('--top', type=int, default=10, help='print the N slowest cells')
+    parser.add_argument('--trace', help='write a Chrome trace of cells and stages to this file')
+    parser.add_argument('--no-plot', action='store_true', help='turn plotting into no-ops (common.lazy)')
+    args = parser.parse_args()
+
+    paths = args.paths + (discover() if args.all else [])
+    if not paths:
+        parser.error('give notebook paths or --all')
+    if args.trace:
+        trace.enable()
+    if args.no_plot:
+        lazy.no_plot()
+
+    runs = []
+    for path in paths:
+        run = NotebookRun(path, nose=args.nose, memory=args.memory, show_output=args.show_output)
+        runs.append(run.run(stop_on_error=args.stop_on_error))
+        errors = sum(c['status'] == 'error' for c in runs[-1]['cells'])
+        print('{}: {:.2f} s, {} cells, {} errors'.format(
+            runs[-1]['notebook'], runs[-1]['wall_s'], len(runs[-1]['cells']), errors))
+
+    report = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'runs': runs,
+    }
+    with open(args.report, 'w') as f:
+        json.dump(report, f, indent=1, default=str)
+    if args.trace:
+        trace.write_chrome_trace(args.trace)
+
+    cells = [(c['wall_s'], r['notebook'], c) for r in runs for c in r['cells']]
+    print('\nslowest cells:')
+    for wall, notebook, c in sorted(cells, key=lambda t: -t[0])[:args.top]:
+        print('{:8.3f} s  {} [{}] {}'.format(wall, notebook, c['cell'], c['source']))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,215 @@
+"""Schema-faithful synthetic replicas of the project datasets.
+
+All datasets in the repo are small (``tv.csv`` is 2 KB, ``apps.csv`` 1.2 MB),
+so they say nothing about how the notebook code behaves at production
+volumes. ``learn_schema`` records, per column, the null rate and the
+distribution of the non-null values:
+
+* ``numeric``  -- 101 quantiles (inverse CDF) and whether values are integral,
+* ``category`` -- every observed value with its frequency,
+* ``datetime`` -- the string format and quantiles of the timestamps,
+* ``text``     -- a sample of high-cardinality strings; replicas append a
+  block number so the cardinality grows with the scale,
+* ``key``      -- join keys, tiled block by block with a fixed stride so that
+  related tables (``pulls`` / ``pull_files``) still join after scaling.
+
+``generate`` draws ``n_rows`` from a schema and ``write_replica`` writes the
+result in the same file format the notebook reads (header, ``?`` markers,
+...). From the ``Projects`` directory::
+
+    python -m common.synth --scales 1 10 100 1000
+    python -m common.synth apps --scales 10 --out /tmp/synth
+"""
+import argparse
+import math
+import os
+
+import numpy as np
+import pandas as pd
+
+PROJECTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_OUT = os.path.join(PROJECTS_DIR, 'benchmarks', 'data')
+
+# name -> path relative to Projects, read_csv keyword arguments, key columns
+DATASETS = {
+    'apps': ('The Android App Market on Google Play/datasets/apps.csv', {}, ['Unnamed: 0']),
+    'user_reviews': ('The Android App Market on Google Play/datasets/user_reviews.csv', {}, []),
+    'nobel': ('A Visual History of Nobel Prize Winners/datasets/nobel.csv', {}, []),
+    'police': ('Analyzing Police Activity with pandas/data/police.csv', {}, []),
+    'weather': ('Analyzing Police Activity with pandas/data/weather.csv', {}, []),
+    'monthly_deaths': ('Dr. Semmelweis and the Discovery of Handwashing/datasets/monthly_deaths.csv', {}, []),
+    'yearly_deaths': ('Dr. Semmelweis and the Discovery of Handwashing/datasets/yearly_deaths_by_clinic.csv', {}, []),
+    'liver': ('Indian Liver Patient Records/indian_liver_patient_preprocessed.csv', {'index_col': 0}, []),
+    'cc_approvals': ('Predicting Credit Card Approvals/datasets/cc_approvals.data', {'header': None}, []),
+    'super_bowls': ('TV, Halftime Shows, and the Big Game/datasets/super_bowls.csv', {}, ['super_bowl']),
+    'tv': ('TV, Halftime Shows, and the Big Game/datasets/tv.csv', {}, ['super_bowl']),
+    'halftime_musicians': ('TV, Halftime Shows, and the Big Game/datasets/halftime_musicians.csv', {}, ['super_bowl']),
+    'pulls_2011-2013': ('The GitHub History of the Scala Language/datasets/pulls_2011-2013.csv', {}, ['pid']),
+    'pulls_2014-2018': ('The GitHub History of the Scala Language/datasets/pulls_2014-2018.csv', {}, ['pid']),
+    'pull_files': ('The GitHub History of the Scala Language/datasets/pull_files.csv', {}, ['pid']),
+}
+
+DATE_FORMATS = ['%Y-%m-%d', '%Y-%m-%dT%H:%M:%SZ', '%Y-%m-%d %H:%M:%S', '%H:%M', '%B %d, %Y', '%m/%d/%Y']
+N_QUANTILES = 101
+MAX_CATEGORIES = 2000
+TEXT_SAMPLE = 5000
+
+
+def dataset_path(name):
+    return os.path.join(PROJECTS_DIR, DATASETS[name][0])
+
+
+def load_dataset(name):
+    """Read one of the ``DATASETS`` the way its notebook does."""
+    path, read_kwargs, _ = DATASETS[name]
+    return pd.read_csv(os.path.join(PROJECTS_DIR, path), **read_kwargs)
+
+
+def _date_format(values):
+    sample = values.iloc[:1000].astype(str)
+    for fmt in DATE_FORMATS:
+        parsed = pd.to_datetime(sample, format=fmt, errors='coerce')
+        if parsed.notna().all():
+            return fmt
+    return None
+
+
+def learn_column(col, key=False):
+    """Schema entry for one column (see the module docstring for the kinds)."""
+    values = col.dropna()
+    spec = {'name': col.name, 'null_rate': float(col.isna().mean()), 'dtype': str(col.dtype)}
+    if len(values) == 0:
+        spec['kind'] = 'empty'
+    elif key:
+        spec.update(kind='key', values=values.tolist(),
+                    stride=10 ** len(str(int(values.max()))))
+    elif pd.api.types.is_bool_dtype(values) or values.nunique() <= min(MAX_CATEGORIES, len(values) // 2):
+        counts = values.value_counts(normalize=True)
+        spec.update(kind='category', values=counts.index.tolist(), weights=counts.tolist())
+    elif pd.api.types.is_numeric_dtype(values):
+        spec.update(kind='numeric',
+                    quantiles=np.quantile(values, np.linspace(0, 1, N_QUANTILES)).tolist(),
+                    integer=bool((values == np.round(values)).all()))
+    elif _date_format(values):
+        fmt = _date_format(values)
+        parsed = pd.to_datetime(values.astype(str), format=fmt)
+        stamps = (parsed - pd.Timestamp(0)) // pd.Timedelta(seconds=1)
+        spec.update(kind='datetime', format=fmt,
+                    quantiles=np.quantile(stamps, np.linspace(0, 1, N_QUANTILES)).tolist())
+    else:
+        sample = values.drop_duplicates()
+        sample = sample.sample(min(TEXT_SAMPLE, len(sample)), random_state=0)
+        spec.update(kind='text', values=sample.astype(str).tolist(), n_unique=int(values.nunique()))
+    return spec
+
+
+def learn_schema(df, keys=()):
+    """Per-column distributions of ``df``; ``keys`` are tiled instead of sampled."""
+    return {
+        'n_rows': len(df),
+        'columns': [learn_column(df[c], key=c in keys) for c in df.columns],
+    }
+
+
+def _from_quantiles(quantiles, u):
+    return np.interp(u, np.linspace(0, 1, len(quantiles)), quantiles)
+
+
+def generate_column(spec, n_rows, rng, n_orig):
+    kind = spec['kind']
+    block = np.arange(n_rows) // n_orig
+    if kind == 'empty':
+        return pd.Series(np.nan, index=range(n_rows))
+    if kind == 'key':
+        values = np.asarray(spec['values'])
+        tiled = values[np.arange(n_rows) % len(values)]
+        out = pd.Series(tiled + block * spec['stride'])
+    elif kind == 'category':
+        values = np.empty(len(spec['values']), dtype=object)
+        values[:] = spec['values']
+        idx = rng.choice(len(values), size=n_rows, p=np.asarray(spec['weights']) / sum(spec['weights']))
+        out = pd.Series(values[idx])
+        if spec['dtype'] in ('bool', 'int64', 'float64'):
+            out = out.astype(spec['dtype'])
+    elif kind == 'numeric':
+        out = _from_quantiles(spec['quantiles'], rng.random(n_rows))
+        out = pd.Series(np.round(out) if spec['integer'] else out)
+    elif kind == 'datetime':
+        stamps = _from_quantiles(spec['quantiles'], rng.random(n_rows)).astype('int64')
+        out = pd.Series(pd.to_datetime(stamps, unit='s').strftime(spec['format']))
+    else:
+        values = np.asarray(spec['values'], dtype=object)
+        picked = values[rng.integers(len(values), size=n_rows)]
+        suffix = np.where(block > 0, ' #' + block.astype(str), '')
+        out = pd.Series(picked + suffix)
+
+    if spec['null_rate'] > 0 and kind != 'key':
+        out[rng.random(n_rows) < spec['null_rate']] = None
+    if kind == 'numeric' and spec['integer'] and spec['null_rate'] == 0:
+        out = out.astype('int64')
+    return out
+
+
+def generate(schema, n_rows, seed=0):
+    """Draw ``n_rows`` rows from ``schema``; columns are sampled independently."""
+    rng = np.random.default_rng(seed)
+    data = {spec['name']: generate_column(spec, n_rows, rng, schema['n_rows'])
+            for spec in schema['columns']}
+    return pd.DataFrame(data)
+
+
+def scale_dataset(name, scale, seed=0):
+    """Replica of ``DATASETS[name]`` with ``scale`` times as many rows."""
+    _, _, keys = DATASETS[name]
+    df = load_dataset(name)
+    schema = learn_schema(df, keys=keys)
+    return generate(schema, int(math.ceil(len(df) * scale)), seed=seed)
+
+
+def replica_path(name, scale, out=DEFAULT_OUT):
+    return os.path.join(out, 'x{}'.format(scale), os.path.basename(DATASETS[name][0]))
+
+
+def write_replica(df, name, path):
+    """Write ``df`` in the same layout as the original file of ``name``."""
+    _, read_kwargs, _ = DATASETS[name]
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if read_kwargs.get('header', 'infer') is None:
+        # cc_approvals.data marks missing values with '?'
+        df.to_csv(path, header=False, index=False, na_rep='?')
+    elif 'index_col' in read_kwargs:
+        df.to_csv(path)
+    else:
+        df.rename(columns=lambda c: '' if str(c).startswith('Unnamed: ') else c).to_csv(path, index=False)
+
+
+def ensure_replica(name, scale, out=DEFAULT_OUT, seed=0):
+    """Path of the ``scale`` replica of ``name``, generating it if needed.
+
+    Raises ``FileNotFoundError`` when the original dataset is not in the tree.
+    """
+    path = replica_path(name, scale, out)
+    if not os.path.exists(path):
+        if not os.path.exists(dataset_path(name)):
+            raise FileNotFoundError(dataset_path(name))
+        write_replica(scale_dataset(name, scale, seed=seed), name, path)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Write 1x/10x/... synthetic replicas of the project datasets.')
+    parser.add_argument('names', nargs='*', help='datasets to scale (default: all that exist)')
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100, 1000])
+    parser.add_argument('--out', default=DEFAULT_OUT)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    names = args.names or [n for n in DATASETS if os.path.exists(dataset_path(n))]
+    for name in names:
+        for scale in args.scales:
+            path = ensure_replica(name, scale, args.out, args.seed)
+            print('{:<20s} x{:<5d} {:>12,d} bytes  {}'.format(name, scale, os.path.getsize(path), path))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""Match a whole list of substrings against a text column in one pass.
+
+The Super Bowl notebook drops marching bands with one ``str.contains`` per
+word, each scanning every row and copying the frame it leaves behind::
+
+    no_bands = halftime_musicians[~halftime_musicians.musician.str.contains('Marching')]
+    no_bands = no_bands[~no_bands.musician.str.contains('Spirit')]
+
+``PatternFilter`` compiles the list once. Literal substrings become a
+single regex laid out as a trie, so patterns sharing a prefix share the
+work (``'Marching'`` and ``'Mariachi'`` become ``Mar(?:ching|iachi)``), and
+a pattern that contains another is dropped, since "contains any" is already
+decided by the shorter one. The column is reduced to its distinct values
+(its categories, or ``pd.factorize`` codes otherwise), every distinct value
+is searched once, and the answers are spread back to the rows by indexing
+with the codes. The result is a plain boolean mask::
+
+    bands = PatternFilter(['Marching', 'Spirit'])
+    no_bands = halftime_musicians[~bands.matches(halftime_musicians.musician)]
+
+Missing values never match. ``regex=True`` takes the patterns as regular
+expressions and joins them with ``|`` instead of building the trie.
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+
+def _trie(words):
+    root = {}
+    for word in words:
+        node = root
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+    return root
+
+
+def _trie_regex(node):
+    # a word ending here already decides "contains", longer ones add nothing
+    if '' in node:
+        return ''
+    branches = [re.escape(char) + _trie_regex(child) for char, child in sorted(node.items())]
+    if len(branches) == 1:
+        return branches[0]
+    return '(?:{})'.format('|'.join(branches))
+
+
+def compile_patterns(patterns, case=True, regex=False):
+    """One compiled regex that finds any of ``patterns``."""
+    patterns = list(patterns)
+    if not patterns:
+        raise ValueError('no patterns to compile')
+    flags = 0 if case else re.IGNORECASE
+    if regex:
+        return re.compile('|'.join('(?:{})'.format(p) for p in patterns), flags)
+    return re.compile(_trie_regex(_trie(patterns)), flags)
+
+
+def _codes(values):
+    """Codes and distinct values of a column; missing values get code -1."""
+    if isinstance(values, pd.Series) and isinstance(values.dtype, pd.CategoricalDtype):
+        return values.cat.codes.to_numpy(), values.cat.categories
+    if isinstance(values, pd.Categorical):
+        return values.codes, values.categories
+    return pd.factorize(values)
+
+
+class PatternFilter:
+    """Compiled "contains any of these" test for text columns."""
+
+    def __init__(self, patterns, case=True, regex=False):
+        self.patterns = list(patterns)
+        self.case = case
+        self.regex = regex
+        self.compiled = compile_patterns(self.patterns, case, regex)
+
+    def matches_unique(self, uniques):
+        """Boolean array: does each of the distinct (string) values contain a pattern."""
+        search = self.compiled.search
+        # iterating an object ndarray is about twice as fast as iterating a str Index
+        uniques = np.asarray(uniques, dtype=object)
+        return np.fromiter((search(value) is not None for value in uniques), dtype=bool, count=len(uniques))
+
+    def matches(self, values):
+        """Boolean mask of the rows of ``values`` that contain any pattern (missing -> ``False``)."""
+        codes, uniques = _codes(values)
+        # code -1 picks the trailing False
+        hits = np.append(self.matches_unique(uniques), False)
+        return hits[codes]
+
+    def any_column(self, frame, columns):
+        """Rows of ``frame`` where any of ``columns`` contains a pattern."""
+        mask = np.zeros(len(frame), dtype=bool)
+        for column in columns:
+            mask |= self.matches(frame[column])
+        return mask
+
+    def exclude(self, frame, *columns):
+        """``frame`` without the rows where one of ``columns`` contains a pattern."""
+        return frame[~self.any_column(frame, columns)]
@@ -0,0 +1,191 @@
+"""Named stages for the project scripts, exported as a Chrome trace.
+
+The scripts are flat sequences of statements, so a slow run does not say
+whether the time went into ``read_csv``, cleaning, a merge or a plot.
+Wrapping those steps in stages records, per stage, wall time, CPU time,
+the growth of the process's peak RSS and the number of rows going in and
+coming out::
+
+    with stage('read police.csv') as s:
+        ri = s.output(pd.read_csv('data/police.csv'))
+
+    @traced('clean')
+    def clean(apps): ...
+
+Tracing is off unless ``enable()`` is called or ``PROJECTS_TRACE`` names a
+file, in which case the trace is written there at exit and the summary is
+printed to stderr::
+
+    PROJECTS_TRACE=trace.json python pandas-Analyzing-Police-Activity.py
+
+When off, ``stage`` hands back one shared no-op object and ``traced``
+calls straight through, so the stages can stay in the code. The JSON is
+the Trace Event Format read by ``chrome://tracing`` and Perfetto; nested
+stages show up nested.
+"""
+import atexit
+import functools
+import json
+import os
+import sys
+import threading
+import time
+
+_state = {'enabled': False, 'events': [], 'origin': time.perf_counter()}
+
+
+def _rows(obj):
+    try:
+        return len(obj)
+    except TypeError:
+        return None
+
+
+def peak_rss():
+    """Peak RSS of the process in bytes, ``None`` where ``resource`` is missing (Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class _NullStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def input(self, obj):
+        return obj
+
+    def output(self, obj):
+        return obj
+
+
+_NULL = _NullStage()
+
+
+class Stage:
+    """One timed stage; ``input``/``output`` record row counts and pass the object through."""
+
+    def __init__(self, name, rows_in=None):
+        self.name = name
+        self.rows_in = rows_in
+        self.rows_out = None
+
+    def input(self, obj):
+        self.rows_in = _rows(obj)
+        return obj
+
+    def output(self, obj):
+        self.rows_out = _rows(obj)
+        return obj
+
+    def __enter__(self):
+        self.rss = peak_rss()
+        self.cpu = time.process_time()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        wall = time.perf_counter() - self.start
+        rss = peak_rss()
+        _state['events'].append({
+            'name': self.name,
+            'start': self.start - _state['origin'],
+            'wall': wall,
+            'cpu': time.process_time() - self.cpu,
+            'peak_rss_delta': None if rss is None else rss - self.rss,
+            'rows_in': self.rows_in,
+            'rows_out': self.rows_out,
+            'failed': exc_type is not None,
+            'thread': threading.get_ident(),
+        })
+        return False
+
+
+def stage(name, rows_in=None):
+    """Context manager for a named stage (a shared no-op while tracing is off)."""
+    if not _state['enabled']:
+        return _NULL
+    return Stage(name, rows_in)
+
+
+def traced(name=None):
+    """Decorator: run the function as a stage; rows of its first argument and result are recorded."""
+    def decorate(func):
+        label = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _state['enabled']:
+                return func(*args, **kwargs)
+            with Stage(label) as s:
+                if args:
+                    s.input(args[0])
+                return s.output(func(*args, **kwargs))
+        return wrapper
+    return decorate
+
+
+def enable():
+    _state['enabled'] = True
+
+
+def disable():
+    _state['enabled'] = False
+
+
+def reset():
+    _state['events'] = []
+    _state['origin'] = time.perf_counter()
+
+
+def events():
+    return list(_state['events'])
+
+
+def chrome_trace():
+    """The recorded stages as Trace Event Format complete (``"X"``) events."""
+    trace = []
+    for e in _state['events']:
+        trace.append({
+            'name': e['name'], 'cat': 'stage', 'ph': 'X', 'pid': os.getpid(), 'tid': e['thread'],
+            'ts': round(e['start'] * 1e6), 'dur': round(e['wall'] * 1e6),
+            'args': {k: e[k] for k in ('cpu', 'peak_rss_delta', 'rows_in', 'rows_out', 'failed')},
+        })
+    return {'traceEvents': trace, 'displayTimeUnit': 'ms'}
+
+
+def write_chrome_trace(path):
+    with open(path, 'w') as f:
+        json.dump(chrome_trace(), f)
+
+
+def summary():
+    """Text table of the stages in the order they ran."""
+    lines = ['{:<40} {:>9} {:>9} {:>12} {:>10} {:>10}'.format(
+        'stage', 'wall s', 'cpu s', 'peak rss +', 'rows in', 'rows out')]
+    for e in _state['events']:
+        rss = e['peak_rss_delta']
+        lines.append('{:<40} {:>9.3f} {:>9.3f} {:>12} {:>10} {:>10}'.format(
+            e['name'][:40], e['wall'], e['cpu'], '' if rss is None else '{:.1f} MB'.format(rss / 2 ** 20),
+            '' if e['rows_in'] is None else e['rows_in'],
+            '' if e['rows_out'] is None else e['rows_out']))
+    total = sum(e['wall'] for e in _state['events'])
+    lines.append('{:<40} {:>9.3f}  (nested stages counted twice)'.format('total', total))
+    return '\n'.join(lines)
+
+
+def _write_at_exit(path):
+    write_chrome_trace(path)
+    print(summary(), file=sys.stderr)
+
+
+if os.environ.get('PROJECTS_TRACE'):
+    enable()
+    atexit.register(_write_at_exit, os.environ['PROJECTS_TRACE'])
@@ -0,0 +1,191 @@
+"""Choose a decision tree's complexity from its cost-complexity pruning path.
+
+``min_samples_leaf=0.13`` in ``ensemble.py`` was found by refitting a tree for
+every candidate value. Cost-complexity pruning gives the whole family of
+subtrees of one fully grown tree instead: ``cost_complexity_pruning_path``
+lists the alphas at which the tree shrinks, and the subtree for any alpha
+can be read off the full tree without refitting. Here that is done for all
+alphas at once:
+
+* ``weakest_link_steps`` replays scikit-learn's minimal cost-complexity
+  pruning once: repeatedly collapse the node with the smallest effective
+  alpha ``(R(t) - R(T_t)) / (|T_t| - 1)``, with the same sums, order and tie
+  breaking as ``_tree.pyx``. ``DecisionTreeClassifier(ccp_alpha=a)`` runs
+  the steps up to the first one whose effective alpha exceeds ``a``, so
+  ``pruned_leaf_index`` reads off, for every node, the first alpha at which
+  it becomes a leaf,
+* ``pruned_predictions`` walks each sample's decision path once and reads
+  its prediction for every alpha from that table.
+
+``tune_ccp_alpha`` does this for every cross-validation fold in parallel
+(one full tree per fold) and picks the alpha with the best mean validation
+accuracy; ``min_samples_leaf_grid`` times the refitting approach for
+comparison.
+"""
+import time
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.model_selection import StratifiedKFold, cross_val_score
+from sklearn.tree import DecisionTreeClassifier
+
+def weakest_link_steps(tree):
+    """Effective alpha and collapsed node of every weakest-link pruning step.
+
+    The steps are those of ``_cost_complexity_prune`` in scikit-learn's
+    ``_tree.pyx``, with its floating point sums in the same order, so the
+    alphas equal ``cost_complexity_pruning_path(...).ccp_alphas[1:]``.
+    """
+    t = tree.tree_
+    left, right = t.children_left, t.children_right
+    r_node = t.weighted_n_node_samples * t.impurity / t.weighted_n_node_samples[0]
+    parent = np.full(t.node_count, -1)
+    internal = np.flatnonzero(left != -1)
+    parent[left[internal]] = internal
+    parent[right[internal]] = internal
+
+    # the risk of a branch is the sum of its leaves, added leaf by leaf
+    r_branch = np.zeros(t.node_count)
+    n_leaves = np.zeros(t.node_count, dtype=np.int64)
+    for leaf in np.flatnonzero(left == -1):
+        r_branch[leaf] = r_node[leaf]
+        node = leaf
+        while node != 0:
+            node = parent[node]
+            r_branch[node] += r_node[leaf]
+            n_leaves[node] += 1
+
+    candidate = left != -1
+    alphas, nodes = [], []
+    while candidate[0]:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            effective = np.where(candidate, (r_node - r_branch) / (n_leaves - 1), np.inf)
+        # the first of equal minima, like the strict < in _tree.pyx
+        weakest = int(np.argmin(effective))
+        alphas.append(effective[weakest])
+        nodes.append(weakest)
+
+        stack = [weakest]
+        while stack:
+            node = stack.pop()
+            candidate[node] = False
+            if left[node] != -1:
+                stack += [left[node], right[node]]
+        n_pruned = n_leaves[weakest] - 1
+        n_leaves[weakest] = 0
+        r_diff = r_node[weakest] - r_branch[weakest]
+        r_branch[weakest] = r_node[weakest]
+        node = parent[weakest]
+        while node != -1:
+            n_leaves[node] -= n_pruned
+            r_branch[node] += r_diff
+            node = parent[node]
+    return np.array(alphas), np.array(nodes, dtype=np.int64)
+
+
+def pruned_leaf_index(tree, alphas):
+    """For every node, the index of the first alpha at which it is a leaf.
+
+    Leaves of the full tree get -1; internal nodes that are not collapsed
+    themselves within ``alphas`` (kept, or removed with a collapsed
+    ancestor) get ``len(alphas)``. ``alphas`` must be sorted.
+    """
+    t = tree.tree_
+    alphas = np.asarray(alphas, dtype=float)
+    step_alphas, step_nodes = weakest_link_steps(tree)
+    # pruning at alpha runs the steps before the first effective alpha above it
+    n_steps = np.searchsorted(np.maximum.accumulate(step_alphas), alphas, side='right')
+    # ccp_alpha=0 does not prune at all
+    n_steps[alphas == 0] = 0
+    first = np.where(t.children_left == -1, -1, len(alphas))
+    first[step_nodes] = np.searchsorted(n_steps, np.arange(len(step_nodes)), side='right')
+    return first
+
+
+def pruned_predictions(tree, X, alphas):
+    """Predictions of ``tree`` pruned at every alpha, shape ``(n_samples, n_alphas)``."""
+    first = pruned_leaf_index(tree, alphas)
+    node_class = tree.classes_[np.argmax(tree.tree_.value[:, 0, :], axis=1)]
+
+    path = tree.decision_path(X).tocsr()
+    path.sort_indices()
+    lengths = np.diff(path.indptr)
+    depth = lengths.max()
+    # root-to-leaf node ids, padded on the right
+    nodes = np.zeros((X.shape[0], depth), dtype=np.int64)
+    valid = np.arange(depth)[None, :] < lengths[:, None]
+    nodes[valid] = path.indices
+
+    prefix_min = np.minimum.accumulate(np.where(valid, first[nodes], len(alphas)), axis=1)
+    steps = np.arange(len(alphas))[None, :]
+    pred = np.empty((X.shape[0], len(alphas)), dtype=node_class.dtype)
+    # deepest node first; a shallower node overrides it for the alphas that prune it
+    for j in range(depth - 1, -1, -1):
+        hit = valid[:, j:j + 1] & (steps >= prefix_min[:, j:j + 1])
+        pred = np.where(hit, node_class[nodes[:, j]][:, None], pred)
+    return pred
+
+
+def pruned_n_leaves(tree, alphas):
+    """Number of leaves of ``tree`` pruned at every alpha."""
+    t = tree.tree_
+    first = pruned_leaf_index(tree, alphas)
+    steps = np.arange(len(alphas))
+    is_leaf = steps[None, :] >= first[:, None]
+    # a node is in the pruned tree if its parent is and is not a leaf there
+    kept = np.zeros((t.node_count, len(alphas)), dtype=bool)
+    kept[0] = True
+    for node in range(t.node_count):
+        for child in (t.children_left[node], t.children_right[node]):
+            if child != -1:
+                kept[child] = kept[node] & ~is_leaf[node]
+    return (kept & is_leaf).sum(axis=0)
+
+
+def _fold_scores(estimator, X, y, train, test, alphas):
+    tree = clone(estimator).fit(X[train], y[train])
+    return (pruned_predictions(tree, X[test], alphas) == y[test][:, None]).mean(axis=0)
+
+
+def tune_ccp_alpha(X, y, estimator=None, cv=5, n_jobs=None, random_state=1):
+    """Cross-validated accuracy of every alpha of the full tree's pruning path.
+
+    Returns the per-alpha scores (with the number of leaves of the full-data
+    tree pruned at that alpha) and a summary dict with the chosen alpha.
+    """
+    start = time.perf_counter()
+    X, y = np.asarray(X), np.asarray(y)
+    if estimator is None:
+        estimator = DecisionTreeClassifier(random_state=random_state)
+    full = clone(estimator).fit(X, y)
+    alphas = full.cost_complexity_pruning_path(X, y).ccp_alphas
+
+    folds = StratifiedKFold(cv, shuffle=True, random_state=random_state).split(X, y)
+    scores = np.array(Parallel(n_jobs=n_jobs)(
+        delayed(_fold_scores)(estimator, X, y, train, test, alphas) for train, test in folds))
+
+    n_leaves = pruned_n_leaves(full, alphas)
+    table = pd.DataFrame({'alpha': alphas, 'mean_accuracy': scores.mean(axis=0),
+                          'std_accuracy': scores.std(axis=0), 'n_leaves': n_leaves})
+    best = table['mean_accuracy'].idxmax()
+    summary = {
+        'ccp_alpha': table.loc[best, 'alpha'],
+        'accuracy': table.loc[best, 'mean_accuracy'],
+        'n_leaves': int(table.loc[best, 'n_leaves']),
+        'n_alphas': len(alphas),
+        'full_tree_leaves': int(full.get_n_leaves()),
+        'seconds': time.perf_counter() - start,
+    }
+    return table, summary
+
+
+def min_samples_leaf_grid(X, y, grid, cv=5, random_state=1):
+    """Cross-validated accuracy of refitted trees over a ``min_samples_leaf`` grid, timed."""
+    start = time.perf_counter()
+    folds = StratifiedKFold(cv, shuffle=True, random_state=random_state)
+    scores = {leaf: cross_val_score(DecisionTreeClassifier(min_samples_leaf=leaf, random_state=random_state),
+                                    X, y, cv=folds).mean()
+              for leaf in grid}
+    return pd.Series(scores, name='mean_accuracy'), time.perf_counter() - start
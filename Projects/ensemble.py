@@ -6,6 +6,7 @@ Created on Fri Apr 17 23:47:59 2020
 """
 import pandas as pd
 from sklearn.metrics import accuracy_score
+from sklearn.model_selection import train_test_split
 
 from sklearn.linear_model import LogisticRegression
 from sklearn.tree import DecisionTreeClassifier
@@ -43,6 +44,35 @@ print('Voting Classifier: {:.3f}'.format(accuracy))
 
 ###################################################################################################
 
+from common.knn import KNNSweep
+
+# One neighbour query for the largest k, then the accuracy of every k <= 50 from that cache
+sweep = KNNSweep().fit(X_train, y_train).query(X_test, k_max=50)
+knn_scores = sweep.scores(y_test)
+print('Best k: uniform {}, distance {}'.format(knn_scores['uniform'].idxmax(), knn_scores['distance'].idxmax()))
+print(knn_scores.loc[[27]])
+
+###################################################################################################
+
+from common.trees import tune_ccp_alpha, min_samples_leaf_grid
+
+# Every subtree on the pruning path of one full tree per fold, instead of refitting for each min_samples_leaf
+ccp_table, ccp = tune_ccp_alpha(X_train, y_train, cv=5, n_jobs=-1, random_state=SEED)
+leaf_scores, leaf_seconds = min_samples_leaf_grid(X_train, y_train, [0.01, 0.02, 0.05, 0.08, 0.1, 0.13, 0.16, 0.2, 0.25], cv=5, random_state=SEED)
+print('ccp_alpha={:.5f} ({} of {} leaves): cv accuracy {:.3f}, {} alphas in {:.2f} s'.format(
+    ccp['ccp_alpha'], ccp['n_leaves'], ccp['full_tree_leaves'], ccp['accuracy'], ccp['n_alphas'], ccp['seconds']))
+print('min_samples_leaf={}: cv accuracy {:.3f}, {} values in {:.2f} s'.format(
+    leaf_scores.idxmax(), leaf_scores.max(), len(leaf_scores), leaf_seconds))
+# what refitting one tree per fold for each of the alphas would have cost at the grid's per-value rate
+refit_seconds = leaf_seconds / len(leaf_scores) * ccp['n_alphas']
+print('Time saved: {:.2f} s against the grid, {:.2f} s ({:.1f}x) against refitting all {} alphas'.format(
+    leaf_seconds - ccp['seconds'], refit_seconds - ccp['seconds'], refit_seconds / ccp['seconds'], ccp['n_alphas']))
+dt_pruned = DecisionTreeClassifier(ccp_alpha=ccp['ccp_alpha'], random_state=SEED).fit(X_train, y_train)
+print('Pruned tree: {} leaves, test accuracy {:.3f}'.format(
+    dt_pruned.get_n_leaves(), accuracy_score(y_test, dt_pruned.predict(X_test))))
+
+###################################################################################################
+
 from sklearn.tree import DecisionTreeClassifier
 from sklearn.ensemble import BaggingClassifier
 
@@ -54,3 +84,12 @@ y_pred = bc.predict(X_test)
 acc_test = accuracy_score(y_test, y_pred)
 print('Test set accuracy of bc: {:.2f}'.format(acc_test)) 
 
+###################################################################################################
+
+from common.bagging import SharedBagging
+
+# Bootstrap index matrix drawn up front, trees stacked into arrays, scored out of bag.
+# Fitted in-process: a process pool (processes=N) needs an if __name__ == '__main__' guard.
+sb = SharedBagging(n_estimators=50, random_state=1).fit(X_train, y_train)
+print('OOB accuracy of sb: {:.2f}'.format(sb.oob_score_))
+print('Test set accuracy of sb: {:.2f}'.format(accuracy_score(y_test, sb.predict(X_test))))
@@ -0,0 +1,54 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common import cache  # noqa: E402
+
+
+def _stage(x):
+    return x
+
+
+def _key(*args):
+    return cache.StageCache(enabled=True).key('stage', _stage, args, {})
+
+
+def test_categorical_categories_and_order_change_key():
+    values = ['good', 'bad', 'good', 'worse']
+    rating = pd.Series(pd.Categorical(values, categories=['bad', 'good', 'worse'], ordered=True))
+    reordered = pd.Series(pd.Categorical(values, categories=['worse', 'bad', 'good'], ordered=True))
+    unordered = pd.Series(pd.Categorical(values, categories=['bad', 'good', 'worse']))
+    keys = {_key(rating), _key(reordered), _key(unordered), _key(rating.to_frame())}
+    assert len(keys) == 4
+    assert _key(rating) == _key(rating.copy())
+
+
+def test_parquet_round_trip(tmp_path):
+    pytest.importorskip('pyarrow')
+    frame = pd.DataFrame({
+        'rating': pd.Categorical(['good', 'bad', 'good'], categories=['bad', 'good'], ordered=True),
+        'installs': np.array([10, 500, 1000], dtype=np.int64),
+        'price': [0.0, 1.99, np.nan],
+        'app': ['a', 'b', None],
+    }, index=pd.Index([3, 1, 2], name='row'))
+    store = cache.StageCache(str(tmp_path), enabled=True)
+    store.put('k', 'stage', frame)
+    assert sorted(os.listdir(tmp_path / 'k')) == ['0.parquet', 'meta.json']
+    pd.testing.assert_frame_equal(store.get('k'), frame)
+
+
+def test_parquet_failure_falls_back_to_pickle(tmp_path, monkeypatch):
+    def refuse(self, path, *args, **kwargs):
+        raise TypeError('cannot convert column')
+
+    monkeypatch.setattr(cache, 'HAVE_PARQUET', True)
+    monkeypatch.setattr(pd.DataFrame, 'to_parquet', refuse)
+    frame = pd.DataFrame({'mixed': [1, 'a', 2.5]})
+    store = cache.StageCache(str(tmp_path), enabled=True)
+    store.put('k', 'stage', frame)
+    assert sorted(os.listdir(tmp_path / 'k')) == ['0.pkl', 'meta.json']
+    pd.testing.assert_frame_equal(store.get('k'), frame)
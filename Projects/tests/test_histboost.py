@@ -0,0 +1,25 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.histboost import MISSING_BIN, apply_bins, bin_edges  # noqa: E402
+
+
+def test_missing_values_get_their_own_bin():
+    rng = np.random.default_rng(0)
+    present = rng.normal(size=(1000, 2))
+    present[:, 1] = rng.integers(0, 5, size=1000)
+    X = present.copy()
+    X[::7] = np.nan
+
+    edges = bin_edges(X, max_bins=16)
+    expected = bin_edges(present[~np.isnan(X[:, 0])], max_bins=16)
+    for cuts, want in zip(edges, expected):
+        np.testing.assert_array_equal(cuts, want)
+
+    codes = apply_bins(X, edges)
+    assert (codes[::7] == MISSING_BIN).all()
+    assert codes[~np.isnan(X).any(axis=1)].max() < MISSING_BIN
+    np.testing.assert_array_equal(codes[1:7], apply_bins(present[1:7], edges))
@@ -0,0 +1,25 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+from sklearn.datasets import make_classification
+from sklearn.tree import DecisionTreeClassifier
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.trees import pruned_n_leaves, pruned_predictions, weakest_link_steps  # noqa: E402
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2, 3, 4])
+def test_pruned_trees_equal_refits(seed):
+    X, y = make_classification(random_state=seed)
+    full = DecisionTreeClassifier(random_state=seed).fit(X, y)
+    alphas = full.cost_complexity_pruning_path(X, y).ccp_alphas
+    np.testing.assert_array_equal(weakest_link_steps(full)[0], alphas[1:])
+
+    n_leaves = pruned_n_leaves(full, alphas)
+    predictions = pruned_predictions(full, X, alphas)
+    for k, alpha in enumerate(alphas):
+        refit = DecisionTreeClassifier(ccp_alpha=alpha, random_state=seed).fit(X, y)
+        assert n_leaves[k] == refit.get_n_leaves()
+        np.testing.assert_array_equal(predictions[:, k], refit.predict(X))